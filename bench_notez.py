@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+"""
+bench_notez - Benchmarks de noteZ sobre corpus sintéticos
+
+Genera archivos notas.txt sintéticos (timestamps realistas, separadores,
+marcas de sesión, líneas vacías, Unicode y emoji) y mide:
+
+  write    → throughput de write_line (nota a nota) y write_batch (texto pegado)
+  read     → apertura de read_notes hasta la primera página (índice en frío y en caliente)
+  render   → carga del panel del modo dual y latencia de render_dual_read_panel
+  search   → búsqueda indexada (construyendo el índice y en caliente) y --grep
+  stress   → varios procesos escribiendo a la vez en el mismo archivo
+             (comprueba que ninguna línea se corta ni se mezcla)
+  startup  → `notez` sin argumentos hasta que aparece el prompt; falla si
+             la mediana supera el presupuesto (--startup-budget, en ms)
+
+Cada medición se ejecuta en un proceso aparte para obtener su pico de RSS.
+
+Uso:
+  python bench_notez.py                          # corpus de 10K y 100K líneas
+  python bench_notez.py --lines 10K,1M,50M       # tamaños a medir
+  python bench_notez.py --only write,read        # solo algunas mediciones
+  python bench_notez.py --json base.json         # guarda los resultados en JSON
+  python bench_notez.py --compare base.json      # marca regresiones respecto a base.json
+  python bench_notez.py --only startup --startup-budget 150
+
+Los corpus se generan una sola vez en --workdir y se reutilizan entre
+ejecuciones (50M líneas ocupan unos 4 GB).
+"""
+
+import sys
+import os
+import io
+import argparse
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import notez
+import stress_notez
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+DEFAULT_LINES = '10K,100K'
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), 'notez-bench')
+# Notas escritas por la medición de escritura
+DEFAULT_WRITE_NOTES = 20000
+# Repeticiones de cada medición (se guarda la mediana)
+DEFAULT_REPEAT = 3
+# Líneas por bloque pegado en la medición de write_batch
+PASTE_BATCH_LINES = 1000
+# Repeticiones de render_dual_read_panel para promediar la latencia
+RENDER_ITERATIONS = 2000
+RENDER_PANEL_LINES = 40
+RENDER_WIDTH = 120
+# Consultas de búsqueda sobre el corpus
+SEARCH_QUERY = 'reunión café'
+GREP_PATTERN = r'deploy \w+ 7'
+# Prueba de concurrencia (stress_notez.py): procesos y notas por proceso
+STRESS_PROCESSES = stress_notez.STRESS_PROCESSES
+STRESS_NOTES = stress_notez.STRESS_NOTES
+# Arranque: lanzamientos medidos y presupuesto de la mediana hasta el prompt (ms)
+STARTUP_LAUNCHES = 10
+STARTUP_BUDGET_MS = 250
+STARTUP_PROMPT = b'[noteZ] >'
+STARTUP_TIMEOUT = 10
+# Variación tolerada antes de marcar una regresión (20%): el ruido entre ejecuciones ronda el 10%
+REGRESSION_THRESHOLD = 0.20
+# Crecimiento mínimo de RSS (MB) para considerarlo regresión
+RSS_REGRESSION_MIN_MB = 2.0
+
+BENCHMARKS = ('write', 'read', 'render', 'search', 'stress', 'startup')
+
+CORPUS_WORDS = (
+    'reunión', 'café', 'deploy', 'idea', 'código', 'bug', 'nota', 'sesión',
+    'revisar', 'login', 'API', 'cliente', 'mañana', 'pendiente', 'ñandú',
+    'documentación', 'prueba', 'fix', 'TODO', 'ok', 'regex', 'índice',
+    '🚀', '✅', '📝', '🔥', '💡', 'añadir', 'configuración', 'logs',
+)
+
+
+# ============================================================================
+# CORPUS SINTÉTICOS
+# ============================================================================
+def parse_count(text):
+    """
+    Interpreta un número de líneas con sufijo opcional (10K, 1M, 50M).
+
+    Args:
+        text (str): Número a interpretar
+
+    Returns:
+        int: Número de líneas
+    """
+    text = text.strip().upper()
+    multiplier = {'K': 1000, 'M': 1000000}.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    return int(float(text) * multiplier)
+
+
+def format_count(count):
+    """Número de líneas en forma corta (10K, 1M) para nombres y tablas."""
+    for suffix, size in (('M', 1000000), ('K', 1000)):
+        if count >= size and count % size == 0:
+            return f"{count // size}{suffix}"
+    return str(count)
+
+
+def corpus_home(workdir, lines):
+    """Directorio que hace de HOME para un corpus (notas en HOME/notez/notas.txt)."""
+    return os.path.join(workdir, f"corpus-{format_count(lines)}")
+
+
+def corpus_path(workdir, lines):
+    """Ruta del notas.txt de un corpus."""
+    return os.path.join(corpus_home(workdir, lines), 'notez', 'notas.txt')
+
+
+def generate_corpus(path, lines, seed=1):
+    """
+    Genera un notas.txt sintético con el formato que escribe noteZ.
+
+    Las notas avanzan en el tiempo como sesiones reales: ráfagas de notas
+    en minutos consecutivos, separadores /n= y /n ocasionales, y cada sesión
+    termina con la marca de fin de sesión (o de Ctrl+C) antes de un salto
+    de horas hasta la siguiente.
+
+    Args:
+        path (str): Archivo a generar
+        lines (int): Número de líneas
+        seed (int): Semilla para que el corpus sea reproducible
+    """
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1, 8, 0)
+    stamp_minute = None
+    stamp = ""
+    session_left = rng.randint(50, 500)
+    buffer = []
+    written = 0
+    tmp_path = path + '.tmp'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        while written < lines:
+            if now != stamp_minute:
+                stamp = now.strftime(notez.TIMESTAMP_FORMAT)
+                stamp_minute = now
+            roll = rng.random()
+            if session_left <= 0:
+                marker = notez.INTERRUPT_TEXT if roll < 0.1 else notez.SESSION_END_TEXT
+                buffer.append(f"{stamp} {marker}\n")
+                now += timedelta(hours=rng.randint(1, 18), minutes=rng.randint(0, 59))
+                session_left = rng.randint(50, 500)
+            elif roll < 0.01:
+                buffer.append(f"{stamp} {notez.SEPARATOR_TEXT}\n")
+            elif roll < 0.013:
+                buffer.append("\n")
+            else:
+                words = rng.choices(CORPUS_WORDS, k=rng.randint(3, 14))
+                buffer.append(f"{stamp} {' '.join(words)} {written}\n")
+                session_left -= 1
+                if roll < 0.3:
+                    now += timedelta(minutes=1)
+            written += 1
+            if len(buffer) >= 10000:
+                f.writelines(buffer)
+                buffer = []
+                if written % 1000000 == 0:
+                    print(f"  ... {format_count(written)} líneas", file=sys.stderr)
+        f.writelines(buffer)
+    os.replace(tmp_path, path)
+
+
+def ensure_corpus(workdir, lines):
+    """
+    Genera el corpus si no existe todavía.
+
+    Returns:
+        str: Ruta del notas.txt del corpus
+    """
+    path = corpus_path(workdir, lines)
+    if not os.path.exists(path):
+        print(f"Generando corpus de {format_count(lines)} líneas en {path}", file=sys.stderr)
+        generate_corpus(path, lines)
+    return path
+
+
+def clear_sidecars(path):
+    """Elimina los índices auxiliares para medir su construcción en frío."""
+    for suffix in (notez.LINE_INDEX_SUFFIX, notez.SEARCH_INDEX_SUFFIX, notez.SEARCH_LOG_SUFFIX):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+# ============================================================================
+# MEDICIONES (cada una se ejecuta en su propio proceso)
+# ============================================================================
+def peak_rss_mb():
+    """
+    Returns:
+        float: Pico de memoria residente del proceso en MB (None si no se puede medir)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB; macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def result(name, value, unit, better, **extra):
+    """
+    Construye el resultado de una medición.
+
+    Args:
+        name (str): Nombre de la medición
+        value (float): Valor medido
+        unit (str): Unidad del valor
+        better (str): 'lower' o 'higher' (dirección en la que mejora)
+
+    Returns:
+        dict: Resultado listo para serializar
+    """
+    entry = {'name': name, 'value': round(value, 6), 'unit': unit, 'better': better}
+    entry.update(extra)
+    return entry
+
+
+def bench_write(path, notes):
+    """Throughput de write_line nota a nota y de write_batch por bloques pegados."""
+    results = []
+    rng = random.Random(2)
+    texts = [' '.join(rng.choices(CORPUS_WORDS, k=rng.randint(3, 14))) for _ in range(1000)]
+
+    start = time.perf_counter()
+    for i in range(notes):
+        notez.write_line(texts[i % len(texts)], path)
+    elapsed = time.perf_counter() - start
+    results.append(result('write_line', notes / elapsed, 'notas/s', 'higher'))
+
+    writer = notez.get_note_writer(path)
+    batch = [texts[i % len(texts)] for i in range(PASTE_BATCH_LINES)]
+    batches = max(1, notes // PASTE_BATCH_LINES)
+    start = time.perf_counter()
+    for _ in range(batches):
+        writer.write_batch(batch)
+    elapsed = time.perf_counter() - start
+    results.append(result('write_batch', batches * PASTE_BATCH_LINES / elapsed, 'líneas/s', 'higher'))
+    notez.close_note_writers()
+    return results
+
+
+def bench_read(path, cold):
+    """Tiempo hasta mostrar la primera página del modo lectura (y salir con /q)."""
+    if cold:
+        clear_sidecars(path)
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin = io.StringIO('/q\n')
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    try:
+        start = time.perf_counter()
+        notez.read_notes(path)
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout.close()
+        sys.stdin, sys.stdout = stdin, stdout
+    return [result('read_cold' if cold else 'read_warm', elapsed * 1000, 'ms', 'lower')]
+
+
+def bench_render(path):
+    """Carga inicial del panel del modo dual y latencia de cada repintado."""
+    start = time.perf_counter()
+    tail = notez.TailBuffer(path)
+    tail.sync(RENDER_PANEL_LINES - 2)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(RENDER_ITERATIONS):
+        notez.render_dual_read_panel(tail, RENDER_PANEL_LINES, RENDER_WIDTH)
+    elapsed = time.perf_counter() - start
+    return [
+        result('render_load', load * 1000, 'ms', 'lower'),
+        result('render_panel', elapsed / RENDER_ITERATIONS * 1e6, 'us', 'lower'),
+    ]
+
+
+def bench_search(path):
+    """Búsqueda indexada (construyendo el índice y en caliente) y grep en paralelo."""
+    clear_sidecars(path)
+    store = notez.TextNoteStore(path)
+    start = time.perf_counter()
+    matches = len(store.search(SEARCH_QUERY))
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    store.search(SEARCH_QUERY)
+    warm = time.perf_counter() - start
+    start = time.perf_counter()
+    grep_matches = sum(1 for _ in notez.grep_notes(path, GREP_PATTERN))
+    grep = time.perf_counter() - start
+    return [
+        result('search_cold', cold * 1000, 'ms', 'lower', matches=matches),
+        result('search_warm', warm * 1000, 'ms', 'lower', matches=matches),
+        result('grep', grep * 1000, 'ms', 'lower', matches=grep_matches),
+    ]
+
+
+def bench_stress(workdir, processes, notes):
+    """
+    Varios procesos escriben a la vez en el mismo archivo (con rotación de
+    segmentos) y se comprueba que cada línea está completa y sin mezclar
+    (ver stress_notez.py).
+    """
+    outcome = stress_notez.run_stress(os.path.join(workdir, f"stress-{os.getpid()}"), processes, notes)
+    return [result(
+        'stress', processes * notes / outcome['elapsed'], 'notas/s', 'higher',
+        ok=outcome['ok'], processes=processes, corrupted=outcome['corrupted'], missing=outcome['missing'],
+    )]
+
+
+def launch_to_prompt(home):
+    """
+    Lanza `notez` sin argumentos en un pseudo-terminal, mide hasta que
+    aparece el prompt y sale con /q.
+
+    Returns:
+        float: Segundos hasta el prompt
+    """
+    import pty
+    import select
+    script = os.path.abspath(notez.__file__)
+    start = time.perf_counter()
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.environ['HOME'] = home
+        os.execv(sys.executable, [sys.executable, script])
+    output = b''
+    try:
+        while STARTUP_PROMPT not in output:
+            ready, _, _ = select.select([fd], [], [], STARTUP_TIMEOUT)
+            if not ready:
+                raise RuntimeError(f"notez no mostró el prompt en {STARTUP_TIMEOUT}s")
+            output += os.read(fd, 65536)
+        elapsed = time.perf_counter() - start
+        os.write(fd, b'/q\n')
+        while select.select([fd], [], [], STARTUP_TIMEOUT)[0]:
+            try:
+                if not os.read(fd, 65536):
+                    break
+            except OSError:  # Linux: EIO al cerrarse el terminal
+                break
+    finally:
+        os.waitpid(pid, 0)
+        os.close(fd)
+    return elapsed
+
+
+def launch_ingest(home):
+    """Sin pty (Windows): `notez` con la entrada vacía (arranque + ingesta)."""
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.abspath(notez.__file__)],
+                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, env=env, check=True)
+    return time.perf_counter() - start
+
+
+def bench_startup(workdir, launches, budget_ms):
+    """
+    Tiempo de arranque de `notez` (el alias de uso diario) hasta el prompt.
+
+    Returns:
+        list: Resultado con la mediana en ms; ok=False si supera el presupuesto
+    """
+    home = os.path.join(workdir, f"startup-{os.getpid()}")
+    shutil.rmtree(home, ignore_errors=True)
+    os.makedirs(home)
+    launch = launch_ingest if sys.platform == 'win32' else launch_to_prompt
+    try:
+        launch(home)  # calienta la caché de disco y el __pycache__ de los imports
+        times = [launch(home) * 1000 for _ in range(launches)]
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+    median = statistics.median(times)
+    rss = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        rss = round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    return [result(
+        'startup', median, 'ms', 'lower',
+        ok=median <= budget_ms, budget_ms=budget_ms, min_ms=round(min(times), 2), rss_mb=rss,
+    )]
+
+
+def run_one(args):
+    """Ejecuta una medición dentro del proceso hijo e imprime su resultado en JSON."""
+    name = args.run_one
+    if name == 'write':
+        home = os.path.join(args.workdir, f"write-{os.getpid()}")
+        os.makedirs(home, exist_ok=True)
+        try:
+            results = bench_write(os.path.join(home, 'notas.txt'), args.notes)
+        finally:
+            shutil.rmtree(home, ignore_errors=True)
+    elif name in ('read_cold', 'read_warm'):
+        results = bench_read(args.corpus, cold=name == 'read_cold')
+    elif name == 'render':
+        results = bench_render(args.corpus)
+    elif name == 'search':
+        results = bench_search(args.corpus)
+    elif name == 'stress':
+        results = bench_stress(args.workdir, args.stress_processes, args.stress_notes)
+    elif name == 'startup':
+        results = bench_startup(args.workdir, STARTUP_LAUNCHES, args.startup_budget)
+    else:
+        raise ValueError(f"Medición desconocida: {name}")
+    rss = peak_rss_mb()
+    for entry in results:
+        # startup mide el RSS de los procesos de notez, no el del harness
+        entry.setdefault('rss_mb', None if rss is None else round(rss, 1))
+    print(json.dumps(results, ensure_ascii=False))
+
+
+def run_child(args, name, corpus=None):
+    """
+    Lanza una medición en procesos nuevos (--repeat veces).
+
+    Returns:
+        list: Resultados con la mediana de los valores y el mayor pico de RSS
+    """
+    runs = [_run_child_once(args, name, corpus) for _ in range(max(1, args.repeat))]
+    merged = []
+    for entries in zip(*runs):
+        entry = dict(entries[-1])
+        entry['value'] = round(statistics.median(e['value'] for e in entries), 6)
+        rss = [e['rss_mb'] for e in entries if e.get('rss_mb') is not None]
+        entry['rss_mb'] = max(rss) if rss else None
+        if any(e.get('ok') is False for e in entries):
+            entry['ok'] = False
+        merged.append(entry)
+    return merged
+
+
+def _run_child_once(args, name, corpus):
+    """Ejecuta una medición en un proceso nuevo y devuelve sus resultados."""
+    command = [
+        sys.executable, os.path.abspath(__file__), '--run-one', name,
+        '--workdir', args.workdir, '--notes', str(args.notes),
+        '--stress-processes', str(args.stress_processes),
+        '--stress-notes', str(args.stress_notes),
+        '--startup-budget', str(args.startup_budget),
+    ]
+    if corpus:
+        command += ['--corpus', corpus]
+    output = subprocess.run(command, stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+# ============================================================================
+# RESULTADOS Y COMPARACIÓN
+# ============================================================================
+def result_key(entry):
+    """Clave que identifica una medición entre ejecuciones."""
+    lines = entry.get('lines')
+    return f"{entry['name']}/{format_count(lines)}" if lines else entry['name']
+
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compara los resultados con los de una ejecución anterior.
+
+    Args:
+        current (list): Resultados de esta ejecución
+        baseline (list): Resultados de la ejecución de referencia
+        threshold (float): Variación tolerada (0.10 = 10%)
+
+    Returns:
+        dict: clave → (cambio relativo, es_regresión, regresión de RSS)
+    """
+    previous = {result_key(entry): entry for entry in baseline}
+    comparison = {}
+    for entry in current:
+        base = previous.get(result_key(entry))
+        if base is None or not base['value']:
+            continue
+        change = (entry['value'] - base['value']) / base['value']
+        if entry['better'] == 'higher':
+            regression = change < -threshold
+        else:
+            regression = change > threshold
+        rss_regression = False
+        if entry.get('rss_mb') and base.get('rss_mb'):
+            growth = entry['rss_mb'] - base['rss_mb']
+            rss_regression = growth > RSS_REGRESSION_MIN_MB and growth / base['rss_mb'] > threshold
+        comparison[result_key(entry)] = (change, regression, rss_regression)
+    return comparison
+
+
+def print_results(results, comparison=None):
+    """Muestra una tabla con los resultados (y el cambio respecto a la referencia)."""
+    print(f"\n{'medición':<24} {'valor':>14} {'unidad':<9} {'RSS MB':>8}  cambio")
+    print("─" * 72)
+    for entry in results:
+        key = result_key(entry)
+        rss = '-' if entry.get('rss_mb') is None else f"{entry['rss_mb']:.1f}"
+        change = ''
+        if comparison and key in comparison:
+            delta, regression, rss_regression = comparison[key]
+            change = f"{delta * 100:+.1f}%"
+            if regression:
+                change += "  ← REGRESIÓN"
+            if rss_regression:
+                change += "  ← RSS"
+        if entry.get('ok') is False:
+            change += "  ← FALLO"
+        print(f"{key:<24} {entry['value']:>14.2f} {entry['unit']:<9} {rss:>8}  {change}")
+
+
+def run_benchmarks(args):
+    """
+    Genera los corpus necesarios y ejecuta las mediciones seleccionadas.
+
+    Returns:
+        list: Resultados de todas las mediciones
+    """
+    selected = [name.strip() for name in args.only.split(',')] if args.only else list(BENCHMARKS)
+    for name in selected:
+        if name not in BENCHMARKS:
+            raise SystemExit(f"Medición desconocida: '{name}' (disponibles: {', '.join(BENCHMARKS)})")
+    sizes = [parse_count(size) for size in args.lines.split(',')]
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = []
+    if 'write' in selected:
+        results += run_child(args, 'write')
+    if 'stress' in selected:
+        results += run_child(args, 'stress')
+    if 'startup' in selected:
+        results += run_child(args, 'startup')
+    for lines in sizes:
+        if not {'read', 'render', 'search'} & set(selected):
+            break
+        corpus = ensure_corpus(args.workdir, lines)
+        size_results = []
+        if 'read' in selected:
+            size_results += run_child(args, 'read_cold', corpus)
+            size_results += run_child(args, 'read_warm', corpus)
+        if 'render' in selected:
+            size_results += run_child(args, 'render', corpus)
+        if 'search' in selected:
+            size_results += run_child(args, 'search', corpus)
+        for entry in size_results:
+            entry['lines'] = lines
+        results += size_results
+    return results
+
+
+def main():
+    """Punto de entrada del harness de benchmarks."""
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except AttributeError:
+            pass
+
+    parser = argparse.ArgumentParser(
+        description="Benchmarks de noteZ sobre corpus sintéticos",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--lines', default=DEFAULT_LINES,
+                        help=f'Tamaños de corpus separados por comas (default: {DEFAULT_LINES})')
+    parser.add_argument('--only', metavar='MEDICIONES',
+                        help=f'Mediciones a ejecutar, separadas por comas ({", ".join(BENCHMARKS)})')
+    parser.add_argument('--notes', type=int, default=DEFAULT_WRITE_NOTES,
+                        help=f'Notas escritas en la medición de escritura (default: {DEFAULT_WRITE_NOTES})')
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR,
+                        help=f'Directorio de los corpus generados (default: {DEFAULT_WORKDIR})')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Repeticiones de cada medición; se usa la mediana (default: {DEFAULT_REPEAT})')
+    parser.add_argument('--json', metavar='ARCHIVO', help='Guarda los resultados en JSON')
+    parser.add_argument('--compare', metavar='ARCHIVO',
+                        help='Compara con un JSON anterior y sale con código 1 si hay regresiones')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='Variación tolerada en --compare (default: 0.20 = 20%%)')
+    parser.add_argument('--stress-processes', type=int, default=STRESS_PROCESSES,
+                        help=f'Procesos de la prueba de concurrencia (default: {STRESS_PROCESSES})')
+    parser.add_argument('--stress-notes', type=int, default=STRESS_NOTES,
+                        help=f'Notas por proceso en la prueba de concurrencia (default: {STRESS_NOTES})')
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET_MS,
+                        help=f'Presupuesto de arranque hasta el prompt en ms (default: {STARTUP_BUDGET_MS})')
+    # Opciones internas de los procesos hijos
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    parser.add_argument('--corpus', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(args)
+        return
+
+    results = run_benchmarks(args)
+    comparison = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            comparison = compare_results(results, json.load(f)['results'], args.threshold)
+    print_results(results, comparison)
+
+    if args.json:
+        report = {
+            'version': 1,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+    failed = any(entry.get('ok') is False for entry in results)
+    regressed = comparison and any(regression or rss for _, regression, rss in comparison.values())
+    if failed or regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,9 +11,24 @@ Plataformas: Windows PowerShell 7 + Android Termux
 
 import sys
 import os
-import argparse
-import shutil
+import io
+import bisect
+import codecs
+import functools
+import mmap
+import queue
+import re
+import signal
+import struct
+import threading
+import time
+import zlib
+import types
+from array import array
+from collections import deque
 from datetime import datetime
+# argparse, asyncio, csv, json y concurrent.futures se importan donde se usan:
+# el arranque sin argumentos (modo grabación) no paga los que no necesita.
 
 
 # ============================================================================
@@ -53,11 +68,20 @@ def get_terminal_size():
     Returns:
         tuple: (columnas, filas) del terminal
     """
+    # Igual que shutil.get_terminal_size (COLUMNS/LINES primero) sin importar shutil
     try:
-        size = shutil.get_terminal_size(fallback=(80, 24))
-        return size.columns, size.lines
-    except Exception:
-        return 80, 24
+        columns = int(os.environ.get('COLUMNS', 0))
+        lines = int(os.environ.get('LINES', 0))
+    except ValueError:
+        columns = lines = 0
+    if columns <= 0 or lines <= 0:
+        try:
+            size = os.get_terminal_size(sys.__stdout__.fileno())
+        except (AttributeError, ValueError, OSError):
+            size = os.terminal_size((80, 24))
+        columns = columns if columns > 0 else (size.columns or 80)
+        lines = lines if lines > 0 else (size.lines or 24)
+    return columns, lines
 
 
 def clear_screen():
@@ -69,7 +93,7 @@ def clear_screen():
     # \033[2J: Limpia pantalla visible
     # \033[3J: Limpia buffer de scrollback (importante para privacidad)
     # \033[H: Mueve cursor al inicio (1,1)
-    print("\033[2J\033[3J\033[H", end="", flush=True)
+    write_terminal("\033[2J\033[3J\033[H")
 
 
 def move_cursor(row, col=1):
@@ -80,14 +104,151 @@ def move_cursor(row, col=1):
         row (int): Número de fila (1-indexed)
         col (int): Número de columna (1-indexed, default=1)
     """
-    print(f"\033[{row};{col}H", end="", flush=True)
+    write_terminal(f"\033[{row};{col}H")
 
 
 def clear_line():
     """
     Limpia la línea actual del cursor.
     """
-    print("\033[2K", end="", flush=True)
+    write_terminal("\033[2K")
+
+
+def write_terminal(text):
+    """
+    Escribe texto en el terminal con un único write y un único flush
+    (salida de los frames y del prompt; --stats mide aquí los bytes enviados).
+    
+    Args:
+        text (str): Texto y secuencias ANSI a escribir
+    """
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+class ScreenRenderer:
+    """
+    Renderizador por diferencias para los modos dual y hide.
+    
+    Conserva el último frame dibujado y, en cada refresco, solo reescribe las
+    filas que cambiaron. Todo el frame se emite con una única escritura y un
+    único flush, lo que evita el parpadeo y reduce el tráfico en SSH/Termux.
+    """
+    
+    def __init__(self, clear_scrollback=False):
+        """
+        Args:
+            clear_scrollback (bool): Si True, limpia el scrollback en cada frame
+                (modo privacidad: lo escrito nunca queda en el historial)
+        """
+        self.clear_scrollback = clear_scrollback
+        self.previous = None
+        self.size = None
+    
+    def invalidate(self):
+        """Fuerza un repintado completo en el próximo frame (tras salida externa)."""
+        self.previous = None
+    
+    def render(self, rows):
+        """
+        Dibuja un frame y deja el cursor en la fila siguiente, lista para el prompt.
+        
+        Args:
+            rows (list): Filas del frame, ya recortadas al ancho del terminal
+        """
+        size = get_terminal_size()
+        full_repaint = self.previous is None or size != self.size
+        previous = [] if full_repaint else self.previous
+        
+        out = []
+        if full_repaint:
+            # Mismas secuencias que clear_screen(), dentro del mismo write
+            out.append("\033[2J\033[3J\033[H")
+        elif self.clear_scrollback:
+            out.append("\033[3J")
+        
+        for i, row in enumerate(rows):
+            if i >= len(previous) or previous[i] != row:
+                # \033[<fila>;1H: posiciona cursor, \033[2K: limpia la fila
+                out.append(f"\033[{i + 1};1H\033[2K{row}")
+        
+        # Cursor bajo el frame y limpieza del resto (prompt anterior, mensajes)
+        out.append(f"\033[{len(rows) + 1};1H\033[J")
+        
+        write_terminal("".join(out))
+        self.previous = list(rows)
+        self.size = size
+    
+    def render_rows(self, rows):
+        """
+        Actualiza filas del frame visible sin mover el cursor del usuario
+        (p. ej. el panel de lectura mientras se está escribiendo una nota).
+        
+        Args:
+            rows (list): Filas del frame completo, como en render()
+            
+        Returns:
+            bool: False si el frame no está en pantalla o cambió el tamaño
+                del terminal (hace falta un render() completo)
+        """
+        if (self.previous is None or len(rows) != len(self.previous)
+                or get_terminal_size() != self.size):
+            return False
+        # \0337 / \0338: guardar y restaurar la posición del cursor
+        out = ["\0337"]
+        for i, row in enumerate(rows):
+            if self.previous[i] != row:
+                out.append(f"\033[{i + 1};1H\033[2K{row}")
+        if len(out) > 1:
+            out.append("\0338")
+            write_terminal("".join(out))
+        self.previous = list(rows)
+        return True
+    
+    def read_input(self, prompt):
+        """
+        Lee una línea del usuario bajo el frame actual.
+        Si el texto escrito desborda la pantalla y provoca scroll, el frame
+        previo ya no coincide con lo visible y se repinta completo.
+        
+        Args:
+            prompt (str): Prompt a mostrar
+            
+        Returns:
+            str: Línea introducida por el usuario
+        """
+        text = input(prompt)
+        if self.previous is not None:
+            term_width, term_height = self.size
+            used_rows = (len(prompt) + len(text)) // max(1, term_width) + 1
+            if len(self.previous) + used_rows >= term_height:
+                self.invalidate()
+        return text
+
+
+def hide_header_lines(compact=False):
+    """
+    Construye las líneas del header del modo hide (privacidad).
+    
+    Args:
+        compact (bool): Si True, solo la caja mínima. Si False, header completo.
+        
+    Returns:
+        list: Líneas del header
+    """
+    lines = [
+        "╭─────────────────────────────────────────╮",
+        "│       noteZ - MODO PRIVACIDAD 🔒       │",
+    ]
+    if not compact:
+        lines += [
+            "│                                         │",
+            "│  La pantalla se limpia tras cada nota   │",
+            "│  Comandos: /n /n= /r /h /q /normal      │",
+            "│  Ctrl+C para salir seguro              │",
+        ]
+    lines.append("╰─────────────────────────────────────────╯")
+    return lines
 
 
 def display_hide_header(compact=False):
@@ -97,14 +258,8 @@ def display_hide_header(compact=False):
     Args:
         compact (bool): Si True, muestra solo la caja mínima. Si False, muestra header completo.
     """
-    print("╭─────────────────────────────────────────╮")
-    print("│       noteZ - MODO PRIVACIDAD 🔒       │")
-    if not compact:
-        print("│                                         │")
-        print("│  La pantalla se limpia tras cada nota   │")
-        print("│  Comandos: /n /n= /r /h /q /normal      │")
-        print("│  Ctrl+C para salir seguro              │")
-    print("╰─────────────────────────────────────────╯")
+    for line in hide_header_lines(compact):
+        print(line)
 
 
 def show_help():
@@ -121,7 +276,9 @@ def show_help():
 │  /n      → Línea vacía (separador)     │
 │  /n=     → Línea decorativa =====      │
 │  /r      → Leer notas (modo lectura)   │
+│  /s txt  → Buscar en las notas         │
 │  /h      → Mostrar esta ayuda          │
+│  /stats  → Latencias (con --stats)     │
 │  /hide   → Modo privacidad (limpia)    │
 │  /dual   → Modo dual (split screen)    │
 │  /normal → Volver a modo normal        │
@@ -131,6 +288,7 @@ def show_help():
 │                                         │
 │  notez           → Modo grabación      │
 │  notez -r        → Modo lectura        │
+│  notez -s txt    → Buscar en notas     │
 │  notez -dual     → Modo dual (split)   │
 │  notez -hide     → Modo privacidad     │
 │                                         │
@@ -146,6 +304,14 @@ def show_help():
 │  La información no queda expuesta      │
 │  Ideal para entornos compartidos       │
 │                                         │
+│ MODO LECTURA:                          │
+│                                         │
+│  Enter   → 5 líneas más hacia atrás    │
+│  - / +   → Página anterior / siguiente │
+│  /i  /f  → Inicio / final del archivo  │
+│  N  N%   → Ir a la línea N / al N%     │
+│  /d fecha → Ir a una fecha             │
+│                                         │
 │ TIPS:                                   │
 │                                         │
 │  • Cada nota se guarda con timestamp    │
@@ -161,275 +327,3985 @@ Presiona Enter para continuar...
     input()  # Esperar Enter para continuar
 
 
-def write_line(line, file_path):
+# ============================================================================
+# BLOQUEO ENTRE PROCESOS (varias sesiones de noteZ sobre las mismas notas)
+# ============================================================================
+# Cada escritura se hace bajo un lock exclusivo sobre un archivo auxiliar
+# (notas.txt.lock) que nunca se rota, así el lock sigue siendo el mismo
+# aunque otro proceso archive el segmento activo.
+LOCK_SUFFIX = '.lock'
+
+
+def _lock_file(f):
+    """Bloquea (esperando si hace falta) el primer byte de un archivo abierto."""
+    if sys.platform == 'win32':
+        import msvcrt
+        f.seek(0)
+        while True:
+            try:
+                # LK_LOCK reintenta durante ~10 s y luego falla: seguir esperando
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(f):
+    """Libera el lock tomado con _lock_file()."""
+    if sys.platform == 'win32':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class FileLock:
     """
-    Escribe una línea al archivo con timestamp automático y maneja comandos especiales.
+    Lock exclusivo entre procesos, usable como context manager.
     
+    Es reentrante dentro del mismo hilo (un `with` anidado no se bloquea),
+    excluye también a los demás hilos del proceso (el lock de archivo no
+    distingue hilos) y mantiene abierto el archivo de lock entre usos.
+    """
+    
+    def __init__(self, lock_path):
+        """
+        Args:
+            lock_path (str): Archivo auxiliar sobre el que se toma el lock
+        """
+        self.lock_path = lock_path
+        self._file = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+    
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                if self._file is None:
+                    self._file = open(self.lock_path, 'a+b')
+                _lock_file(self._file)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+        return self
+    
+    def __exit__(self, *exc):
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                _unlock_file(self._file)
+        finally:
+            self._thread_lock.release()
+    
+    def close(self):
+        """Cierra el archivo de lock (debe estar liberado)."""
+        with self._thread_lock:
+            if self._file is not None and self._depth == 0:
+                self._file.close()
+                self._file = None
+
+
+# ============================================================================
+# ALMACENAMIENTO SEGMENTADO (rotación de notas.txt)
+# ============================================================================
+# notas.txt es siempre el segmento activo (donde se escribe). Al superar
+# SEGMENT_MAX_BYTES o al cambiar de mes se archiva en notas.txt.segments/ y se
+# empieza uno nuevo. Lectura, modo dual, índices y búsqueda ven todos los
+# segmentos como un único flujo continuo de bytes.
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+SEGMENT_ROTATE_MONTHLY = True
+SEGMENTS_SUFFIX = '.segments'
+SEGMENT_MANIFEST = 'manifest.json'
+SEGMENT_NAME_RE = re.compile(r'^\d{6}\.(txt|nzz)$')
+
+# Compresión de segmentos fríos: bloques zlib independientes, de modo que
+# leer cualquier punto solo descomprime el bloque que lo contiene.
+# Los SEGMENT_KEEP_PLAIN segmentos archivados más recientes quedan sin comprimir.
+SEGMENT_COMPRESS = True
+SEGMENT_KEEP_PLAIN = 1
+SEGMENT_BLOCK_SIZE = 64 * 1024
+SEGMENT_COMPRESS_LEVEL = 6
+COMPRESSED_SEGMENT_MAGIC = b'NZSEGZ01'
+# Lock (en el directorio de segmentos) que evita que dos procesos compriman a la vez
+SEGMENT_COMPRESS_LOCK = 'compress.lock'
+# Cola del archivo comprimido: tamaño descomprimido, tamaño de bloque, nº de bloques, magic
+COMPRESSED_SEGMENT_FOOTER = struct.Struct('<QQQ8s')
+
+# Segmentos leídos por directorio, invalidados cuando cambia el directorio o el manifest
+_segments_cache = {}
+
+
+def segments_dir(file_path):
+    """
     Args:
-        line (str): Línea de texto a escribir o comando especial
         file_path (str): Ruta completa al archivo de notas
         
     Returns:
-        str: Acción a tomar ('quit', 'read', 'hide', 'dual', 'normal', 'continue')
+        str: Directorio donde se guardan los segmentos archivados
     """
-    # Manejar comandos especiales
-    if line == '/q':
-        # Escribir línea decorativa final y salir
-        timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
-        try:
-            with open(file_path, 'a', encoding='utf-8') as f:
-                f.write(f"{timestamp} ============================ Sesión finalizada ===========================\n")
-        except Exception as e:
-            print(f"Error al guardar: {e}")
-        return 'quit'
-        
-    elif line == '/r':
-        # Activar modo lectura temporal
-        return 'read'
-        
-    elif line == '/n':
-        # Línea vacía como separador mínimo
-        try:
-            with open(file_path, 'a', encoding='utf-8') as f:
-                f.write("\n")
-        except Exception as e:
-            print(f"Error al guardar: {e}")
-        return 'continue'
-        
-    elif line == '/n=':
-        # Línea decorativa con separador
-        timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
-        try:
-            with open(file_path, 'a', encoding='utf-8') as f:
-                f.write(f"{timestamp} ==========================================================================\n")
-        except Exception as e:
-            print(f"Error al guardar: {e}")
-        return 'continue'
-        
-    elif line == '/h':
-        # Mostrar ayuda y continuar
-        show_help()
-        return 'continue'
-        
-    elif line == '/hide':
-        # Activar modo hide
-        return 'hide'
+    return file_path + SEGMENTS_SUFFIX
 
-    elif line == '/dual':
-        # Activar modo dual
-        return 'dual'
 
-    elif line == '/normal':
-        # Ya estamos en modo normal (grabación), pero retornamos explícitamente
-        print("(Ya estás en modo normal)")
-        return 'continue'
-        
-    else:
-        # Línea normal de nota con timestamp
-        if line.strip():  # Solo escribir si no está vacía
-            timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
-            try:
-                with open(file_path, 'a', encoding='utf-8') as f:
-                    f.write(f"{timestamp} {line}\n")
-            except Exception as e:
-                print(f"Error al guardar: {e}")
-        return 'continue'
+def _segments_key(seg_dir):
+    """
+    Clave de caché del directorio de segmentos. Incluye el inodo del manifest,
+    que cambia en cada reescritura atómica aunque el mtime no llegue a variar
+    (dos rotaciones de procesos distintos dentro del mismo tick del reloj).
+    """
+    try:
+        dir_st = os.stat(seg_dir)
+    except OSError:
+        return None
+    try:
+        manifest_st = os.stat(os.path.join(seg_dir, SEGMENT_MANIFEST))
+        manifest_key = (manifest_st.st_ino, manifest_st.st_mtime_ns, manifest_st.st_size)
+    except OSError:
+        manifest_key = None
+    return dir_st.st_mtime_ns, manifest_key
 
 
-def read_notes(file_path, return_to_recording=False):
+def load_segments(file_path):
     """
-    Modo lectura interactivo con paginación eficiente.
-    Muestra las últimas 10 líneas inicialmente, +5 por cada Enter.
+    Lista los segmentos archivados en orden, según el manifest.
+    Si hay segmentos en disco que el manifest no recoge (p. ej. tras un corte
+    durante la rotación), se añaden al final y el manifest se reescribe.
     
     Args:
         file_path (str): Ruta completa al archivo de notas
-        return_to_recording (bool): Si True, indica que debe volver al modo grabación al salir
+        
+    Returns:
+        list: Diccionarios {'name', 'size', 'path'} del más antiguo al más reciente
     """
-    if not os.path.exists(file_path):
-        print("No hay notas guardadas aún. Usa 'notez' para empezar a escribir.")
-        return
+    seg_dir = segments_dir(file_path)
+    key = _segments_key(seg_dir)
+    if key is None:
+        return []
+    cached = _segments_cache.get(seg_dir)
+    if cached and cached[0] == key:
+        return cached[1]
     
+    manifest_path = os.path.join(seg_dir, SEGMENT_MANIFEST)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-    except Exception as e:
-        print(f"Error al leer archivo: {e}")
-        return
+        import json
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f).get('segments', [])
+    except (OSError, ValueError):
+        entries = []
     
-    if not all_lines:
-        print("El archivo de notas está vacío.")
-        return
+    on_disk = set(os.listdir(seg_dir))
+    # Un segmento se identifica por su número: durante la compresión pueden
+    # coexistir 000001.txt y 000001.nzz, y solo cuenta el del manifest
+    known = {entry['name'][:6] for entry in entries}
+    segments = [entry for entry in entries if entry['name'] in on_disk]
+    missing = sorted(name for name in on_disk
+                     if name[:6] not in known and SEGMENT_NAME_RE.match(name))
+    missing = [name for i, name in enumerate(missing)
+               if i == 0 or name[:6] != missing[i - 1][:6]]
+    for name in missing:
+        segments.append({'name': name, 'size': segment_logical_size(os.path.join(seg_dir, name))})
+    segments.sort(key=lambda entry: entry['name'])
+    if missing or len(segments) != len(entries):
+        save_segments(file_path, segments)
+        key = _segments_key(seg_dir)
     
-    total_lines = len(all_lines)
-    current_end = total_lines
-    lines_per_page = 10
-    lines_per_scroll = 5
+    for entry in segments:
+        entry['path'] = os.path.join(seg_dir, entry['name'])
+    _segments_cache[seg_dir] = (key, segments)
+    return segments
+
+
+def save_segments(file_path, segments):
+    """
+    Escribe el manifest de segmentos (reemplazo atómico).
     
-    context_info = " (desde grabación)" if return_to_recording else ""
-    print(f"\n╭── noteZ READ MODE{context_info} ── {total_lines} líneas totales ──╮")
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        segments (list): Segmentos en orden, como los devuelve load_segments()
+    """
+    seg_dir = segments_dir(file_path)
+    manifest_path = os.path.join(seg_dir, SEGMENT_MANIFEST)
+    data = {
+        'version': 1,
+        'segments': [
+            {key: value for key, value in entry.items() if key != 'path'}
+            for entry in segments
+        ],
+    }
+    import json
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def archive_active_segment(file_path):
+    """
+    Archiva el segmento activo (notas.txt) como el siguiente segmento.
+    Solo se archiva si no está vacío y termina en salto de línea, para que
+    ninguna línea quede partida entre dos segmentos.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        
+    Returns:
+        bool: True si se archivó el segmento
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if not size:
+                return False
+            f.seek(size - 1)
+            if f.read(1) != b'\n':
+                return False
+    except OSError:
+        return False
     
-    # Mostrar últimas 10 líneas inicialmente
-    start_idx = max(0, current_end - lines_per_page)
-    for i in range(start_idx, current_end):
-        print(f"{i+1:4d} │ {all_lines[i].rstrip()}")
+    seg_dir = segments_dir(file_path)
+    os.makedirs(seg_dir, exist_ok=True)
+    segments = load_segments(file_path)
+    last_number = int(segments[-1]['name'][:6]) if segments else 0
+    name = f"{last_number + 1:06d}.txt"
     
-    current_end = start_idx
+    os.replace(file_path, os.path.join(seg_dir, name))
+    segments = [dict(entry) for entry in segments]
+    segments.append({'name': name, 'size': size})
+    save_segments(file_path, segments)
+    return True
+
+
+def compress_segment(source_path, target_path, block_size=SEGMENT_BLOCK_SIZE):
+    """
+    Comprime un segmento en bloques zlib independientes.
     
-    while True:
-        if current_end <= 0:
-            prompt = "[noteZ READ MODE] -- Inicio del archivo -- /q para salir --"
-        else:
-            prompt = "[noteZ READ MODE] -- Enter para más, /q para salir --"
+    Formato: magic, bloques comprimidos, tabla de offsets de cada bloque
+    (array 'Q', uno más que bloques) y la cola COMPRESSED_SEGMENT_FOOTER.
+    
+    Args:
+        source_path (str): Segmento de texto plano
+        target_path (str): Archivo comprimido a crear (reemplazo atómico)
+        block_size (int): Bytes descomprimidos por bloque
         
-        try:
-            user_input = input(f"\n{prompt} ")
-            
-            if user_input.strip() == '/q':
+    Returns:
+        int: Tamaño descomprimido del segmento
+    """
+    offsets = array('Q')
+    raw_size = 0
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        dst.write(COMPRESSED_SEGMENT_MAGIC)
+        while True:
+            block = src.read(block_size)
+            if not block:
                 break
-            elif user_input.strip() == '/h':
-                show_help()
-                continue
-            else:
-                # Mostrar 5 líneas adicionales hacia atrás
-                if current_end > 0:
-                    new_start = max(0, current_end - lines_per_scroll)
-                    # Preservar contexto: mostrar últimas 5 líneas anteriores también
-                    context_start = max(0, min(current_end, new_start + lines_per_scroll) - lines_per_scroll)
-                    
-                    print()  # Línea en blanco para separación
-                    for i in range(new_start, min(current_end, new_start + lines_per_scroll)):
-                        print(f"{i+1:4d} │ {all_lines[i].rstrip()}")
-                    
-                    current_end = new_start
-                else:
-                    print("\n── Ya estás en el inicio del archivo ──")
-                    
-        except KeyboardInterrupt:
-            print("\n\n¡Hasta luego!")
-            break
-    
-    if return_to_recording:
-        print("\nVolviendo al modo grabación...")
-    else:
-        print("\nSaliendo del modo lectura...")
+            offsets.append(dst.tell())
+            dst.write(zlib.compress(block, SEGMENT_COMPRESS_LEVEL))
+            raw_size += len(block)
+        offsets.append(dst.tell())
+        offsets.tofile(dst)
+        dst.write(COMPRESSED_SEGMENT_FOOTER.pack(
+            raw_size, block_size, len(offsets) - 1, COMPRESSED_SEGMENT_MAGIC
+        ))
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp_path, target_path)
+    return raw_size
 
 
-def render_dual_read_panel(file_path, read_lines, term_width):
+def compress_cold_segments(file_path, notes_lock):
     """
-    Renderiza el panel de lectura para el modo dual.
+    Comprime los segmentos archivados salvo los SEGMENT_KEEP_PLAIN más recientes.
     
-    Args:
-        file_path (str): Ruta al archivo de notas
-        read_lines (int): Número de líneas disponibles para el panel de lectura
-        term_width (int): Ancho del terminal
+    La compresión (lenta: lee, comprime y hace fsync de cada segmento) se hace
+    sin el lock de las notas, así que ni la nota que provocó la rotación ni
+    otros procesos esperan por ella. Solo el cambio del manifest se hace bajo
+    el lock, releyéndolo para no perder una rotación hecha mientras tanto. El
+    manifest se actualiza antes de borrar el original: un corte en cualquier
+    punto deja siempre una copia completa referenciada.
     
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        notes_lock (FileLock): Lock de escritura de las notas (el del almacén)
+        
     Returns:
-        list: Lista de líneas formateadas para mostrar
+        int: Número de segmentos comprimidos
     """
-    display_lines = []
-    
-    # Línea de encabezado
-    header = "╭── noteZ DUAL MODE ── Panel de Lectura (tiempo real) ──╮"
-    display_lines.append(header[:term_width])
+    seg_dir = segments_dir(file_path)
+    if not os.path.isdir(seg_dir):
+        return 0
+    compress_lock = FileLock(os.path.join(seg_dir, SEGMENT_COMPRESS_LOCK))
+    compressed = 0
+    try:
+        with compress_lock:
+            segments = load_segments(file_path)
+            cold = segments[:max(0, len(segments) - SEGMENT_KEEP_PLAIN)]
+            for entry in cold:
+                if not entry['name'].endswith('.txt'):
+                    continue
+                name = entry['name'][:6] + '.nzz'
+                size = compress_segment(entry['path'], os.path.join(seg_dir, name))
+                with notes_lock:
+                    current = [dict(item) for item in load_segments(file_path)]
+                    for item in current:
+                        if item['name'] == entry['name']:
+                            item['name'], item['size'] = name, size
+                            save_segments(file_path, current)
+                            os.remove(entry['path'])
+                            compressed += 1
+                            break
+    finally:
+        compress_lock.close()
+    return compressed
+
+
+def segment_logical_size(path):
+    """
+    Args:
+        path (str): Segmento archivado (texto plano o comprimido)
+        
+    Returns:
+        int: Tamaño del segmento descomprimido
+    """
+    if path.endswith('.nzz'):
+        with CompressedSegment(path) as segment:
+            return segment.size
+    return os.path.getsize(path)
+
+
+class CompressedSegment:
+    """
+    Lectura aleatoria de un segmento comprimido por bloques.
     
-    # Líneas disponibles para contenido (descontar header y separador)
-    content_lines = read_lines - 2
+    Solo se descomprimen los bloques que se leen; se guardan los dos
+    últimos para que la lectura hacia atrás y readline() sobre el límite
+    de un bloque no descompriman dos veces.
+    """
     
-    if not os.path.exists(file_path):
-        display_lines.append("│ (No hay notas guardadas aún)")
-        # Rellenar con líneas vacías
-        for _ in range(content_lines - 1):
-            display_lines.append("│")
-    else:
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Ruta al segmento .nzz
+        """
+        self._file = open(path, 'rb')
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                all_lines = f.readlines()
-            
-            if not all_lines:
-                display_lines.append("│ (El archivo está vacío)")
-                for _ in range(content_lines - 1):
-                    display_lines.append("│")
-            else:
-                # Mostrar las últimas N líneas que quepan
-                total = len(all_lines)
-                start_idx = max(0, total - content_lines)
-                
-                for i in range(start_idx, total):
-                    line_content = all_lines[i].rstrip()
-                    # Truncar si es muy larga
-                    max_content_width = term_width - 7  # "1234 │ "
-                    if len(line_content) > max_content_width:
-                        line_content = line_content[:max_content_width - 3] + "..."
-                    formatted_line = f"{i+1:4d} │ {line_content}"
-                    display_lines.append(formatted_line[:term_width])
-                
-                # Rellenar con líneas vacías si no hay suficientes notas
-                lines_shown = total - start_idx
-                for _ in range(content_lines - lines_shown):
-                    display_lines.append("│")
+            self._file.seek(-COMPRESSED_SEGMENT_FOOTER.size, os.SEEK_END)
+            self.size, self.block_size, block_count, magic = COMPRESSED_SEGMENT_FOOTER.unpack(
+                self._file.read(COMPRESSED_SEGMENT_FOOTER.size)
+            )
+            if magic != COMPRESSED_SEGMENT_MAGIC:
+                raise ValueError(f"Segmento comprimido inválido: {path}")
+            table_size = (block_count + 1) * 8
+            self._file.seek(-COMPRESSED_SEGMENT_FOOTER.size - table_size, os.SEEK_END)
+            self.offsets = array('Q')
+            self.offsets.frombytes(self._file.read(table_size))
         except Exception:
-            display_lines.append("│ (Error al leer archivo)")
-            for _ in range(content_lines - 1):
-                display_lines.append("│")
+            self._file.close()
+            raise
+        self._cache = {}
+        self._pos = 0
     
-    # Línea separadora
-    separator = "╰" + "─" * (term_width - 2) + "╯"
-    display_lines.append(separator[:term_width])
+    def __enter__(self):
+        return self
     
-    return display_lines
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """Cierra el archivo comprimido."""
+        self._file.close()
+        self._cache.clear()
+    
+    def seek(self, offset):
+        """Posiciona la lectura en un offset del segmento descomprimido."""
+        self._pos = offset
+    
+    def _block(self, number):
+        """Devuelve un bloque descomprimido, usando la caché si está."""
+        block = self._cache.get(number)
+        if block is None:
+            self._file.seek(self.offsets[number])
+            block = zlib.decompress(self._file.read(self.offsets[number + 1] - self.offsets[number]))
+            if len(self._cache) >= 2:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[number] = block
+        return block
+    
+    def read(self, size):
+        """Lee hasta `size` bytes desde la posición actual."""
+        chunks = []
+        while size > 0 and self._pos < self.size:
+            number, inner = divmod(self._pos, self.block_size)
+            data = self._block(number)[inner:inner + size]
+            chunks.append(data)
+            self._pos += len(data)
+            size -= len(data)
+        return b''.join(chunks)
+    
+    def readline(self, limit):
+        """Lee hasta el siguiente salto de línea (como máximo `limit` bytes)."""
+        chunks = []
+        while limit > 0 and self._pos < self.size:
+            number, inner = divmod(self._pos, self.block_size)
+            block = self._block(number)
+            end = block.find(b'\n', inner, inner + limit)
+            data = block[inner:end + 1 if end >= 0 else inner + limit]
+            chunks.append(data)
+            self._pos += len(data)
+            limit -= len(data)
+            if end >= 0:
+                break
+        return b''.join(chunks)
 
 
-def run_dual_mode(file_path):
+def notes_signature(file_path):
     """
-    Ejecuta el modo dual con panel de lectura arriba y grabación abajo.
-    El panel superior muestra las notas en tiempo real (80% del espacio).
-    El panel inferior permite escribir nuevas notas (20% del espacio).
+    Firma del flujo de notas usada para detectar índices desactualizados.
     
     Args:
         file_path (str): Ruta completa al archivo de notas
         
     Returns:
-        str: Próximo estado ('quit', 'normal', 'hide')
+        tuple: (tamaño lógico total, mtime_ns del segmento activo)
     """
-    def refresh_display():
-        """Refresca la pantalla completa del modo dual."""
-        term_width, term_height = get_terminal_size()
-        
-        # Calcular líneas para el panel de lectura
-        read_panel_lines = max(5, int(term_height * DUAL_READ_PANEL_RATIO))
-        
-        # Limpiar pantalla
-        clear_screen()
-        
-        # Renderizar panel de lectura
-        read_display = render_dual_read_panel(file_path, read_panel_lines, term_width)
-        for line in read_display:
-            print(line)
-        
-        # Línea de información del panel de escritura
-        write_header = f"╭── Panel de Escritura ── /h ayuda ── /q salir ──╮"
-        print(write_header[:term_width])
+    archived = sum(entry['size'] for entry in load_segments(file_path))
+    try:
+        st = os.stat(file_path)
+        return archived + st.st_size, st.st_mtime_ns
+    except OSError:
+        return archived, 0
+
+
+def notes_size(file_path):
+    """
+    Args:
+        file_path (str): Ruta completa al archivo de notas
         
+    Returns:
+        int: Tamaño lógico de todas las notas (segmentos archivados + activo)
+    """
+    return notes_signature(file_path)[0]
+
+
+def notes_exist(file_path):
+    """
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        
+    Returns:
+        bool: True si hay notas guardadas (en el segmento activo o archivadas)
+    """
+    return os.path.exists(file_path) or bool(load_segments(file_path))
+
+
+class NoteStream:
+    """
+    Vista binaria de solo lectura de todos los segmentos como un único archivo.
+    
+    Implementa seek/tell/read/readline con offsets lógicos (los mismos que
+    usan el índice de líneas y el de búsqueda). El tamaño se fija al abrir,
+    y el segmento activo (y los que aún pueden comprimirse) quedan abiertos
+    desde ese momento: si otro proceso rota mientras se lee, se siguen
+    leyendo los mismos bytes.
+    """
+    
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path (str): Ruta completa al archivo de notas
+        """
+        while True:
+            segments = load_segments(file_path)
+            try:
+                active = open(file_path, 'rb')
+            except FileNotFoundError:
+                active = None
+            # Una rotación entre ambos pasos cambia el manifiesto: reintentar
+            # hasta ver el mismo manifiesto antes y después de abrir
+            if load_segments(file_path) == segments:
+                break
+            if active is not None:
+                active.close()
+        
+        self.parts = []  # (offset lógico inicial, tamaño, ruta)
+        self._handles = {}  # parte → archivo abierto desde el inicio
+        start = 0
+        for entry in segments:
+            path = entry['path']
+            # Solo un segmento sin comprimir puede desaparecer (al comprimirse)
+            if SEGMENT_COMPRESS and not path.endswith('.nzz'):
+                try:
+                    self._handles[len(self.parts)] = open(path, 'rb')
+                except FileNotFoundError:
+                    # Se comprimió después de leer el manifiesto
+                    path = os.path.splitext(path)[0] + '.nzz'
+            self.parts.append((start, entry['size'], path))
+            start += entry['size']
+        active_size = os.fstat(active.fileno()).st_size if active is not None else 0
+        if active_size or not self.parts:
+            if not self.parts and active is None:
+                # Mismo error que open() si no hay notas
+                raise FileNotFoundError(f"No existe el archivo de notas: {file_path}")
+            self._handles[len(self.parts)] = active
+            self.parts.append((start, active_size, file_path))
+            start += active_size
+        elif active is not None:
+            active.close()
+        self.size = start
+        self._starts = [part[0] for part in self.parts]
+        self._pos = 0
+        self._open_part = None
+        self._open_file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _close_lazy(self):
+        """Cierra el segmento abierto bajo demanda en _locate()."""
+        if self._open_file is not None and self._open_part not in self._handles:
+            self._open_file.close()
+        self._open_file = None
+        self._open_part = None
+    
+    def close(self):
+        """Cierra todos los segmentos abiertos."""
+        self._close_lazy()
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+    
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Posiciona la lectura en un offset lógico."""
+        if whence == os.SEEK_END:
+            offset += self.size
+        elif whence == os.SEEK_CUR:
+            offset += self._pos
+        self._pos = max(0, offset)
+        return self._pos
+    
+    def tell(self):
+        """Offset lógico actual."""
+        return self._pos
+    
+    def _locate(self):
+        """Abre el segmento que contiene la posición actual y se sitúa en él."""
+        i = bisect.bisect_right(self._starts, self._pos) - 1
+        start, size, path = self.parts[i]
+        if self._open_part != i:
+            self._close_lazy()
+            if i in self._handles:
+                self._open_file = self._handles[i]
+            else:
+                self._open_file = CompressedSegment(path) if path.endswith('.nzz') else open(path, 'rb')
+            self._open_part = i
+        self._open_file.seek(self._pos - start)
+        return self._open_file, start + size - self._pos
+    
+    def read(self, size=-1):
+        """Lee hasta `size` bytes (todo lo que queda si es negativo)."""
+        if size is None or size < 0:
+            size = self.size - self._pos
+        chunks = []
+        while size > 0 and self._pos < self.size:
+            f, available = self._locate()
+            data = f.read(min(size, available))
+            if not data:
+                break
+            chunks.append(data)
+            self._pos += len(data)
+            size -= len(data)
+        return b''.join(chunks)
+    
+    def readline(self):
+        """Lee una línea completa aunque cruce el límite entre segmentos."""
+        chunks = []
+        while self._pos < self.size:
+            f, available = self._locate()
+            line = f.readline(available)
+            if not line:
+                break
+            chunks.append(line)
+            self._pos += len(line)
+            if line.endswith(b'\n'):
+                break
+        return b''.join(chunks)
+
+
+def open_notes(file_path):
+    """
+    Abre el flujo lógico de notas para lectura binaria.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        
+    Returns:
+        NoteStream: Flujo con todos los segmentos, del más antiguo al activo
+    """
+    return NoteStream(file_path)
+
+
+# ============================================================================
+# ÍNDICE DE LÍNEAS (sidecar binario junto al archivo de notas)
+# ============================================================================
+# El índice guarda el offset en bytes donde empieza cada línea, de modo que
+# el total de líneas y la posición de cualquier línea se obtienen sin
+# recorrer el archivo de notas.
+LINE_INDEX_SUFFIX = '.idx'
+LINE_INDEX_MAGIC = b'NZLIDX01'
+# Cabecera: magic, tamaño indexado, mtime_ns indexado, termina en salto de línea
+LINE_INDEX_HEADER = struct.Struct('<8sQqQ')
+LINE_INDEX_ENTRY_SIZE = 8  # Cada offset es un entero sin signo de 64 bits ('Q')
+
+
+class LineIndex:
+    """
+    Índice persistente de offsets de línea para un archivo de notas.
+    
+    Se actualiza de forma incremental (con cada escritura o indexando solo
+    los bytes añadidos desde la última vez) y se reconstruye automáticamente
+    si las notas ya indexadas cambiaron (por ejemplo, tras editarlas a mano).
+    """
+    
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path (str): Ruta completa al archivo de notas
+        """
+        self.file_path = file_path
+        self.index_path = file_path + LINE_INDEX_SUFFIX
+        # Dos hilos o procesos no deben añadir las mismas líneas al índice
+        self.lock = FileLock(self.index_path + LOCK_SUFFIX)
+    
+    def _read_header(self):
+        """
+        Lee la cabecera del índice.
+        
+        Returns:
+            tuple: (tamaño, mtime_ns, termina_en_salto) o None si no es válida
+        """
+        try:
+            with open(self.index_path, 'rb') as f:
+                raw = f.read(LINE_INDEX_HEADER.size)
+        except OSError:
+            return None
+        if len(raw) != LINE_INDEX_HEADER.size:
+            return None
+        magic, size, mtime_ns, ends_with_newline = LINE_INDEX_HEADER.unpack(raw)
+        if magic != LINE_INDEX_MAGIC:
+            return None
+        return size, mtime_ns, bool(ends_with_newline)
+    
+    def is_fresh(self):
+        """
+        Comprueba si el índice corresponde al estado actual del archivo de notas.
+        
+        Returns:
+            bool: True si tamaño y mtime coinciden con los indexados
+        """
+        header = self._read_header()
+        if header is None or not notes_exist(self.file_path):
+            return False
+        size, mtime_ns = notes_signature(self.file_path)
+        return header[0] == size and header[1] == mtime_ns
+    
+    def ensure_fresh(self):
+        """Actualiza el índice si está desactualizado o no existe."""
+        if not self.is_fresh():
+            self.update()
+    
+    def _is_append_of(self, header):
+        """
+        Comprueba que el archivo de notas solo creció desde lo indexado: el
+        último offset está dentro de lo indexado y el último byte indexado y
+        el anterior a la última línea siguen siendo los mismos saltos de línea.
+        
+        Args:
+            header (tuple): Cabecera actual del índice
+            
+        Returns:
+            bool: True si basta con indexar los bytes añadidos
+        """
+        indexed_size, _, ends_with_newline = header
+        if indexed_size == 0:
+            return True
+        with open(self.index_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < LINE_INDEX_HEADER.size + LINE_INDEX_ENTRY_SIZE:
+                return False
+            f.seek(-LINE_INDEX_ENTRY_SIZE, os.SEEK_END)
+            last_start = struct.unpack('<Q', f.read(LINE_INDEX_ENTRY_SIZE))[0]
+        if last_start >= indexed_size:
+            # Offsets escritos sin llegar a actualizar la cabecera
+            return False
+        with open_notes(self.file_path) as f:
+            f.seek(indexed_size - 1)
+            if (f.read(1) == b'\n') != ends_with_newline:
+                return False
+            if last_start:
+                f.seek(last_start - 1)
+                return f.read(1) == b'\n'
+        return True
+    
+    def update(self, chunk_size=1024 * 1024):
+        """
+        Indexa solo los bytes añadidos desde la última actualización. Si el
+        índice no existe o las notas no crecieron por el final, lo reconstruye.
+        
+        Args:
+            chunk_size (int): Bytes leídos por cada bloque
+        """
+        with self.lock:
+            header = self._read_header()
+            size, mtime_ns = notes_signature(self.file_path)
+            if header is None or header[0] > size or not self._is_append_of(header):
+                self.rebuild(chunk_size)
+                return
+            if header[0] == size:
+                if header[1] != mtime_ns:
+                    # Mismo tamaño con otro mtime: una edición a mano (las
+                    # rotaciones propias ya actualizan la firma en rotate())
+                    self.rebuild(chunk_size)
+                return
+            with open_notes(self.file_path) as f:
+                f.seek(header[0])
+                while header[0] < size:
+                    block = f.read(min(chunk_size, size - header[0]))
+                    if not block:
+                        # Las notas cambiaron mientras se leían: seguirá la próxima vez
+                        break
+                    header = self._extend(header, block, mtime_ns)
+    
+    def rebuild(self, chunk_size=1024 * 1024):
+        """
+        Reconstruye el índice completo recorriendo el archivo por bloques.
+        
+        Args:
+            chunk_size (int): Bytes leídos por cada bloque
+        """
+        with self.lock:
+            offsets = array('Q')
+            pos = 0
+            last_byte = b''
+            signature = notes_signature(self.file_path)
+            with open_notes(self.file_path) as f:
+                while True:
+                    block = f.read(chunk_size)
+                    if not block:
+                        break
+                    if pos == 0:
+                        offsets.append(0)
+                    # Cada salto de línea abre una línea nueva justo después
+                    next_start = pos
+                    for part in block.split(b'\n')[:-1]:
+                        next_start += len(part) + 1
+                        offsets.append(next_start)
+                    pos += len(block)
+                    last_byte = block[-1:]
+            
+            # Un salto de línea al final del archivo no abre una línea nueva
+            if offsets and offsets[-1] == pos:
+                offsets.pop()
+            
+            header = LINE_INDEX_HEADER.pack(
+                LINE_INDEX_MAGIC, pos, signature[1], int(last_byte == b'\n')
+            )
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(header)
+                offsets.tofile(f)
+            os.replace(tmp_path, self.index_path)
+    
+    def record_append(self, start, data):
+        """
+        Añade al índice las líneas nuevas de un bloque recién escrito.
+        
+        Args:
+            start (int): Offset del archivo donde se escribió el bloque
+            data (bytes): Bytes escritos
+        """
+        with self.lock:
+            header = self._read_header()
+            size, mtime_ns = notes_signature(self.file_path)
+            if header is None or header[0] != start or size != start + len(data):
+                # Otro proceso o una edición externa cambió el archivo
+                self.update()
+                return
+            self._extend(header, data, mtime_ns)
+    
+    def _extend(self, header, data, mtime_ns):
+        """
+        Añade los offsets de un bloque que empieza justo donde acaba lo indexado.
+        
+        Args:
+            header (tuple): Cabecera actual del índice
+            data (bytes): Bytes que siguen a lo indexado
+            mtime_ns (int): mtime del segmento activo a guardar en la cabecera
+            
+        Returns:
+            tuple: La nueva cabecera
+        """
+        start, _, ends_with_newline = header
+        size = start + len(data)
+        new_offsets = array('Q')
+        if start == 0 or ends_with_newline:
+            new_offsets.append(start)
+        next_start = start
+        for part in data.split(b'\n')[:-1]:
+            next_start += len(part) + 1
+            new_offsets.append(next_start)
+        if new_offsets and new_offsets[-1] == size:
+            new_offsets.pop()
+        
+        ends_with_newline = data.endswith(b'\n') if data else ends_with_newline
+        with open(self.index_path, 'r+b') as f:
+            f.seek(0, os.SEEK_END)
+            new_offsets.tofile(f)
+            f.seek(0)
+            f.write(LINE_INDEX_HEADER.pack(
+                LINE_INDEX_MAGIC, size, mtime_ns, int(ends_with_newline)
+            ))
+        return size, mtime_ns, ends_with_newline
+    
+    def refresh_signature(self):
+        """
+        Actualiza la firma de un índice vigente tras una rotación de segmento,
+        que no cambia ningún offset pero sí el segmento activo.
+        """
+        with self.lock:
+            header = self._read_header()
+            if header is None:
+                return
+            size, mtime_ns = notes_signature(self.file_path)
+            if size != header[0]:
+                return
+            with open(self.index_path, 'r+b') as f:
+                f.write(LINE_INDEX_HEADER.pack(LINE_INDEX_MAGIC, size, mtime_ns, int(header[2])))
+    
+    def line_count(self):
+        """
+        Returns:
+            int: Número total de líneas del archivo de notas
+        """
+        self.ensure_fresh()
+        size = os.path.getsize(self.index_path)
+        return (size - LINE_INDEX_HEADER.size) // LINE_INDEX_ENTRY_SIZE
+    
+    def line_offset(self, line_number):
+        """
+        Obtiene el offset en bytes donde empieza una línea.
+        
+        Args:
+            line_number (int): Número de línea (1-indexed, como en modo lectura)
+            
+        Returns:
+            int: Offset de la línea, o el tamaño del archivo si está fuera de rango
+        """
+        self.ensure_fresh()
+        with open(self.index_path, 'rb') as f:
+            _, size, _, _ = LINE_INDEX_HEADER.unpack(f.read(LINE_INDEX_HEADER.size))
+            if line_number < 1:
+                return 0
+            f.seek(LINE_INDEX_HEADER.size + (line_number - 1) * LINE_INDEX_ENTRY_SIZE)
+            raw = f.read(LINE_INDEX_ENTRY_SIZE)
+        if len(raw) != LINE_INDEX_ENTRY_SIZE:
+            return size
+        return struct.unpack('<Q', raw)[0]
+
+
+# ============================================================================
+# ESCRITURA DE NOTAS (writer compartido por todos los modos)
+# ============================================================================
+# Política de durabilidad de cada nota:
+#   'flush'    → entrega los datos al sistema operativo tras cada nota (default)
+#   'fsync'    → además fuerza la escritura física a disco tras cada nota
+#   'interval' → flush tras cada nota y fsync cada N notas o N milisegundos
+WRITE_DURABILITY = 'flush'
+DURABILITY_MODES = ('flush', 'fsync', 'interval')
+WRITE_FSYNC_INTERVAL_NOTES = 20
+WRITE_FSYNC_INTERVAL_MS = 1000
+
+# Formato del timestamp de cada nota (strftime). Lectura por fecha, búsqueda
+# y exportación reconocen el formato clásico y el ISO-8601 con segundos.
+TIMESTAMP_FORMAT_CLASSIC = "[%d-%m-%Y | %H:%M]"
+TIMESTAMP_FORMAT_ISO = "[%Y-%m-%dT%H:%M:%S]"
+TIMESTAMP_FORMAT = TIMESTAMP_FORMAT_CLASSIC
+# Directivas de strftime que muestran segundos (el texto cambia cada segundo)
+TIMESTAMP_SECOND_DIRECTIVES = ('%S', '%T', '%X', '%c', '%r', '%s')
+
+# Líneas especiales que se escriben tras el timestamp
+SEPARATOR_TEXT = "=========================================================================="
+SESSION_END_TEXT = "============================ Sesión finalizada ==========================="
+INTERRUPT_TEXT = "========== Interrupción del usuario =========="
+
+
+# ============================================================================
+# ALMACÉN DE NOTAS (interfaz común y backends intercambiables)
+# ============================================================================
+# 'text'   → notas.txt con segmentos, índice de líneas e índice de búsqueda (default)
+# 'sqlite' → notas.db (WAL) con timestamps indexados y búsqueda FTS5
+STORE_BACKEND = 'text'
+# Archivo (junto a las notas) donde se recuerda el backend elegido con --backend,
+# para que todos los modos y comandos abran siempre el mismo almacén
+BACKEND_SETTING_NAME = 'backend'
+SQLITE_DB_SUFFIX = '.db'
+# Líneas por transacción al importar notas.txt en SQLite
+SQLITE_IMPORT_BATCH = 50000
+
+
+class NoteStore:
+    """
+    Interfaz de almacenamiento de notas usada por todos los modos.
+    
+    Las líneas se numeran desde 1 en orden de escritura. Las posiciones
+    devueltas por append() y size() son opacas: solo sirven para saber si
+    el almacén cambió entre dos lecturas (p. ej. el panel del modo dual).
+    `location` es la ruta donde se guardan las notas (para mensajes).
+    """
+    
+    location = None
+    
+    def append(self, text):
+        """
+        Añade texto ya formateado (una o más líneas terminadas en salto de línea).
+        
+        Returns:
+            tuple: (posición inicial, posición final) del bloque escrito
+        """
+        raise NotImplementedError
+    
+    def sync(self):
+        """Fuerza a disco todo lo escrito hasta ahora."""
+        raise NotImplementedError
+    
+    def close(self):
+        """Cierra el almacén (puede llamarse varias veces)."""
+        raise NotImplementedError
+    
+    def exists(self):
+        """Returns: bool: True si hay notas guardadas."""
+        raise NotImplementedError
+    
+    def size(self):
+        """Returns: int: Posición final actual (ver append())."""
+        raise NotImplementedError
+    
+    def line_count(self):
+        """Returns: int: Número total de líneas."""
+        raise NotImplementedError
+    
+    def read_since(self, position, max_bytes):
+        """
+        Lee las líneas completas añadidas después de una posición (ver size()).
+        
+        Args:
+            position (int): Posición ya leída
+            max_bytes (int): Si se añadió más que esto, mejor releer el final
+            
+        Returns:
+            tuple: (líneas nuevas, nueva posición), o None si las notas se
+                acortaron o crecieron más de max_bytes
+        """
+        raise NotImplementedError
+    
+    def watch_paths(self):
+        """Returns: list: Archivos cuyo cambio indica notas nuevas."""
+        raise NotImplementedError
+    
+    def flush_pending(self):
+        """Completa la durabilidad pendiente si ya venció su plazo (temporizador de sesión)."""
+    
+    def update_indexes(self):
+        """
+        Pone al día los índices auxiliares con todo lo escrito y hace el
+        mantenimiento pendiente, como comprimir segmentos (ver IndexWorker).
+        """
+    
+    def iter_lines_reverse(self, end_line=None):
+        """
+        Args:
+            end_line (int): Última línea incluida (default: la última)
+            
+        Yields:
+            str: Cada línea sin salto de línea, de la más reciente a la más antigua
+        """
+        raise NotImplementedError
+    
+    def iter_lines(self, first_line, last_line):
+        """
+        Yields:
+            str: Las líneas first_line..last_line (incluidas) en orden
+        """
+        raise NotImplementedError
+    
+    def find_line_by_time(self, when, after=False):
+        """
+        Args:
+            when (tuple): Fecha como (año, mes, día, hora, minuto)
+            after (bool): Si True, busca la primera línea estrictamente posterior
+            
+        Returns:
+            int: Primera línea con fecha >= when (> si after); total + 1 si no hay
+        """
+        raise NotImplementedError
+    
+    def search(self, query):
+        """
+        Returns:
+            list: Números de línea (ascendentes) que contienen todos los términos
+        """
+        raise NotImplementedError
+    
+    def grep(self, pattern):
+        """
+        Args:
+            pattern (str): Expresión regular (se aplica al texto de cada línea)
+            
+        Yields:
+            tuple: (número de línea, texto) de cada línea que coincide, en orden
+        """
+        raise NotImplementedError
+
+
+class TextNoteStore(NoteStore):
+    """
+    Backend de texto plano: notas.txt más sus segmentos archivados.
+    
+    Mantiene el segmento activo abierto en modo append, aplica la política
+    de durabilidad, rota segmentos y actualiza el índice de líneas tras
+    cada escritura (o deja que lo haga un IndexWorker, si hay uno activo).
+    """
+    
+    def __init__(self, file_path, durability=WRITE_DURABILITY):
+        """
+        Args:
+            file_path (str): Ruta completa al archivo de notas
+            durability (str): Política de durabilidad (ver DURABILITY_MODES)
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Modo de durabilidad desconocido: '{durability}'")
+        self.file_path = file_path
+        self.location = file_path
+        self.durability = durability
+        self.index = LineIndex(file_path)
+        self.lock = FileLock(file_path + LOCK_SUFFIX)
+        # True mientras un IndexWorker mantiene los índices fuera de append()
+        self.background_indexing = False
+        self._file = None
+        self._active_month = None
+        self._unsynced_notes = 0
+        self._last_sync = time.monotonic()
+        # Hay segmentos archivados por comprimir (se hace fuera del lock)
+        self._compress_pending = False
+        # La última rotación falló (se informa una sola vez hasta que funcione)
+        self._rotation_failed = False
+    
+    def _ensure_open(self):
+        """Abre el archivo de notas la primera vez que se necesita."""
+        if self._file is None:
+            # Sin buffer: cada bloque llega al archivo en una sola llamada a write()
+            self._file = open(self.file_path, 'ab', buffering=0)
+            self._active_month = None
+            if os.fstat(self._file.fileno()).st_size:
+                with open(self.file_path, 'rb') as f:
+                    self._note_month(f.read(READ_CHUNK_SIZE))
+        return self._file
+    
+    def _note_month(self, data):
+        """Recuerda el mes del primer timestamp del segmento activo."""
+        for raw_line in data.split(b'\n')[:TIMESTAMP_SCAN_LIMIT]:
+            when = parse_line_timestamp(raw_line)
+            if when is not None:
+                self._active_month = when[:2]
+                return
+    
+    def _reopen_if_rotated(self):
+        """Reabre el segmento activo si otro proceso lo archivó o reemplazó."""
+        if self._file is None:
+            return
+        try:
+            current = os.stat(self.file_path)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self._file.fileno())
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self._file.close()
+            self._file = None
+    
+    def _maybe_rotate(self):
+        """Archiva el segmento activo si superó el tamaño máximo o cambió el mes."""
+        f = self._ensure_open()
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        if size >= SEGMENT_MAX_BYTES:
+            self.rotate()
+        elif SEGMENT_ROTATE_MONTHLY and self._active_month is not None:
+            now = datetime.now()
+            if (now.year, now.month) != self._active_month:
+                self.rotate()
+    
+    def rotate(self):
+        """
+        Cierra el segmento activo, lo archiva y empieza uno nuevo vacío.
+        El índice de líneas sigue siendo válido: los offsets son lógicos.
+        
+        Returns:
+            bool: True si se rotó (no se rota un segmento vacío o sin salto de
+                línea final, ni si el sistema no permite renombrarlo)
+        """
+        index_was_fresh = self.index.is_fresh()
+        search_was_fresh = SearchIndex(self.file_path).is_fresh()
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+        try:
+            archived = archive_active_segment(self.file_path)
+        except OSError as e:
+            # En Windows notas.txt no se puede renombrar mientras otra sesión
+            # lo tiene abierto: la nota va al segmento activo y la rotación
+            # se reintenta en la próxima escritura
+            if not self._rotation_failed:
+                print(f"Error al rotar el segmento de notas: {e}")
+            self._rotation_failed = True
+            return False
+        self._rotation_failed = False
+        if not archived:
+            return False
+        self._compress_pending = SEGMENT_COMPRESS
+        self._ensure_open()
+        if index_was_fresh:
+            self.index.refresh_signature()
+        if search_was_fresh:
+            SearchIndex(self.file_path).refresh_signature()
+        return True
+    
+    def append(self, text):
+        """
+        Añade texto al final del segmento activo.
+        
+        Args:
+            text (str): Texto a añadir (ya formateado, con saltos de línea)
+            
+        Returns:
+            tuple: (offset lógico inicial, offset lógico final) del bloque escrito
+        """
+        # Mantener los saltos de línea nativos como hacía el modo texto
+        data = text.replace('\n', os.linesep).encode('utf-8')
+        # Rotación, escritura e índice bajo el lock: otras sesiones esperan
+        # y nunca ven (ni intercalan) un bloque a medias
+        with self.lock:
+            self._reopen_if_rotated()
+            self._maybe_rotate()
+            f = self._ensure_open()
+            archived = sum(entry['size'] for entry in load_segments(self.file_path))
+            active_size = os.fstat(f.fileno()).st_size
+            start = archived + active_size
+            written = 0
+            while written < len(data):
+                written += f.write(data[written:])
+            if self._active_month is None:
+                self._note_month(data)
+            self._commit()
+            end = start + len(data)
+            
+            if not self.background_indexing:
+                try:
+                    self.index.record_append(start, data)
+                except OSError:
+                    # La nota ya está guardada; el índice se reconstruirá al consultarlo
+                    pass
+        if self._compress_pending and not self.background_indexing:
+            # Sin IndexWorker (ingesta, comandos): ya sin el lock de las notas
+            self.compress_segments()
+        return start, end
+    
+    def compress_segments(self):
+        """Comprime los segmentos fríos pendientes tras una rotación (ver compress_cold_segments)."""
+        self._compress_pending = False
+        try:
+            compress_cold_segments(self.file_path, self.lock)
+        except OSError as e:
+            # Los segmentos sin comprimir siguen siendo válidos
+            print(f"Error al comprimir segmentos: {e}")
+    
+    def _commit(self):
+        """Aplica la política de durabilidad tras una escritura."""
+        self._file.flush()
+        if self.durability == 'fsync':
+            os.fsync(self._file.fileno())
+        elif self.durability == 'interval':
+            self._unsynced_notes += 1
+            elapsed_ms = (time.monotonic() - self._last_sync) * 1000
+            if (self._unsynced_notes >= WRITE_FSYNC_INTERVAL_NOTES
+                    or elapsed_ms >= WRITE_FSYNC_INTERVAL_MS):
+                self.sync()
+    
+    def sync(self):
+        """Fuerza a disco todo lo escrito hasta ahora."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced_notes = 0
+        self._last_sync = time.monotonic()
+    
+    def flush_pending(self):
+        if self.durability != 'interval' or not self._unsynced_notes:
+            return
+        elapsed_ms = (time.monotonic() - self._last_sync) * 1000
+        if elapsed_ms >= WRITE_FSYNC_INTERVAL_MS:
+            with self.lock:
+                self.sync()
+    
+    def update_indexes(self):
+        if self._compress_pending:
+            self.compress_segments()
+        if not self.exists():
+            return
+        self.index.ensure_fresh()
+        SearchIndex(self.file_path).update()
+    
+    def close(self):
+        """Completa cualquier fsync pendiente y cierra el archivo."""
+        self.lock.close()
+        self.index.lock.close()
+        if self._file is None:
+            return
+        try:
+            if self.durability != 'flush':
+                self.sync()
+        finally:
+            self._file.close()
+            self._file = None
+    
+    def exists(self):
+        return notes_exist(self.file_path)
+    
+    def size(self):
+        return notes_size(self.file_path)
+    
+    def line_count(self):
+        return self.index.line_count()
+    
+    def read_since(self, position, max_bytes):
+        with open_notes(self.file_path) as f:
+            if position > f.size or f.size - position > max_bytes:
+                return None
+            f.seek(position)
+            data = f.read()
+        # Una línea a medias (otra sesión escribiendo) se leerá la próxima vez
+        end = data.rfind(b'\n') + 1
+        text = data[:end].decode('utf-8', errors='replace')
+        return [line.rstrip('\r') for line in text.split('\n')[:-1]], position + end
+    
+    def watch_paths(self):
+        return [self.file_path]
+    
+    def iter_lines_reverse(self, end_line=None):
+        end_offset = None if end_line is None else self.index.line_offset(end_line + 1)
+        return iter_lines_reverse(self.file_path, end_offset=end_offset)
+    
+    def iter_lines(self, first_line, last_line):
+        with open_notes(self.file_path) as f:
+            f.seek(self.index.line_offset(first_line))
+            for _ in range(first_line, last_line + 1):
+                raw = f.readline()
+                if not raw:
+                    break
+                yield raw.decode('utf-8', errors='replace').rstrip('\r\n')
+    
+    def find_line_by_time(self, when, after=False):
+        return find_line_by_time(self.file_path, when, after)
+    
+    def search(self, query):
+        return SearchIndex(self.file_path).search(query)
+    
+    def grep(self, pattern):
+        return grep_notes(self.file_path, pattern)
+
+
+class SqliteNoteStore(NoteStore):
+    """
+    Backend SQLite: una fila por línea en notas.db.
+    
+    Usa WAL para que las lecturas no bloqueen la escritura, guarda el
+    timestamp de cada nota como entero indexado (aaaammddHHMM) para las
+    consultas por fecha y mantiene una tabla FTS5 sin contenido para la
+    búsqueda (insensible a mayúsculas y acentos).
+    """
+    
+    def __init__(self, file_path, durability=WRITE_DURABILITY):
+        """
+        Args:
+            file_path (str): Ruta al archivo de notas (la base se guarda junto a él)
+            durability (str): 'fsync' usa synchronous=FULL; el resto, NORMAL
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Modo de durabilidad desconocido: '{durability}'")
+        import sqlite3
+        self.file_path = file_path
+        self.db_path = os.path.splitext(file_path)[0] + SQLITE_DB_SUFFIX
+        self.location = self.db_path
+        self.durability = durability
+        # Espera generosa al lock de escritura de otras sesiones. La conexión
+        # se comparte con el vigilante del modo dual, que solo lee
+        self.conn = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=%s" % ('FULL' if durability == 'fsync' else 'NORMAL'))
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS notes ("
+                "line INTEGER PRIMARY KEY, ts INTEGER, text TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS notes_ts ON notes(ts) WHERE ts IS NOT NULL")
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+                "body, content='', tokenize='unicode61 remove_diacritics 2')"
+            )
+    
+    def append(self, text):
+        return self.append_lines(text.split('\n')[:-1])
+    
+    def append_lines(self, lines):
+        """
+        Inserta líneas en una sola transacción.
+        
+        Args:
+            lines (list): Líneas sin salto de línea final
+            
+        Returns:
+            tuple: (líneas antes, líneas después) como posiciones
+        """
+        parsed = []
+        for line in lines:
+            stamp = parse_line_timestamp(line.encode('utf-8'))
+            parsed.append((_stamp_key(stamp) if stamp else None, line, TIMESTAMP_PREFIX_RE.sub('', line)))
+        with self.conn:
+            # Reservar la escritura antes de numerar: otras sesiones esperan
+            self.conn.execute("BEGIN IMMEDIATE")
+            start = self.line_count()
+            self.conn.executemany(
+                "INSERT INTO notes(line, ts, text) VALUES (?, ?, ?)",
+                ((line_number, ts, line)
+                 for line_number, (ts, line, _) in enumerate(parsed, start=start + 1))
+            )
+            self.conn.executemany(
+                "INSERT INTO notes_fts(rowid, body) VALUES (?, ?)",
+                ((line_number, body)
+                 for line_number, (_, _, body) in enumerate(parsed, start=start + 1) if body.strip())
+            )
+        return start, start + len(parsed)
+    
+    def sync(self):
+        self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+    
+    def exists(self):
+        return self.line_count() > 0
+    
+    def size(self):
+        return self.line_count()
+    
+    def line_count(self):
+        return self.conn.execute("SELECT COALESCE(MAX(line), 0) FROM notes").fetchone()[0]
+    
+    def read_since(self, position, max_bytes):
+        if position > self.line_count():
+            return None
+        lines = []
+        read_bytes = 0
+        for (text,) in self.conn.execute(
+                "SELECT text FROM notes WHERE line > ? ORDER BY line", (position,)):
+            read_bytes += len(text) + 1
+            if read_bytes > max_bytes:
+                return None
+            lines.append(text)
+        return lines, position + len(lines)
+    
+    def watch_paths(self):
+        return [self.db_path, self.db_path + '-wal']
+    
+    def iter_lines_reverse(self, end_line=None):
+        if end_line is None:
+            end_line = self.line_count()
+        cursor = self.conn.execute(
+            "SELECT text FROM notes WHERE line <= ? ORDER BY line DESC", (end_line,)
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(256)
+                if not rows:
+                    return
+                for (text,) in rows:
+                    yield text
+        finally:
+            cursor.close()
+    
+    def iter_lines(self, first_line, last_line):
+        cursor = self.conn.execute(
+            "SELECT text FROM notes WHERE line BETWEEN ? AND ? ORDER BY line",
+            (first_line, last_line)
+        )
+        for (text,) in cursor:
+            yield text
+    
+    def find_line_by_time(self, when, after=False):
+        # Como en el backend de texto, las líneas sin timestamp (/n) pertenecen
+        # a la siguiente línea que lo tenga
+        op = '>' if after else '>='
+        row = self.conn.execute(
+            f"SELECT MIN(line) FROM notes WHERE ts {op} ?", (_stamp_key(when),)
+        ).fetchone()
+        first_match = row[0] if row[0] is not None else self.line_count() + 1
+        row = self.conn.execute(
+            "SELECT MAX(line) FROM notes WHERE ts IS NOT NULL AND line < ?", (first_match,)
+        ).fetchone()
+        return (row[0] or 0) + 1
+    
+    def search(self, query):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = ' '.join('"%s"' % term for term in sorted(terms))
+        rows = self.conn.execute(
+            "SELECT rowid FROM notes_fts WHERE notes_fts MATCH ? ORDER BY rowid", (match,)
+        )
+        return [line_number for (line_number,) in rows]
+    
+    def grep(self, pattern):
+        # SQLite recorre las filas en un solo hilo; el patrón se aplica al
+        # texto de cada línea, igual que en el backend de texto
+        regex = re.compile(pattern)
+        for line_number, text in self.conn.execute("SELECT line, text FROM notes ORDER BY line"):
+            if regex.search(text):
+                yield line_number, text
+    
+    def import_text(self, file_path, batch_lines=SQLITE_IMPORT_BATCH):
+        """
+        Carga en bloque un notas.txt (con sus segmentos) en la base vacía.
+        
+        Args:
+            file_path (str): Ruta al archivo de notas de texto
+            batch_lines (int): Líneas insertadas por transacción
+            
+        Returns:
+            int: Número de líneas importadas
+        """
+        if self.line_count():
+            raise ValueError(f"La base {self.db_path} ya contiene notas")
+        imported = 0
+        batch = []
+        # Las escrituras masivas no necesitan fsync por transacción
+        self.conn.execute("PRAGMA synchronous=OFF")
+        try:
+            with open_notes(file_path) as f:
+                for raw in iter(f.readline, b''):
+                    batch.append(raw.decode('utf-8', errors='replace').rstrip('\r\n'))
+                    if len(batch) >= batch_lines:
+                        imported += len(batch)
+                        self.append_lines(batch)
+                        batch = []
+            if batch:
+                imported += len(batch)
+                self.append_lines(batch)
+        finally:
+            self.conn.execute("PRAGMA synchronous=%s" % ('FULL' if self.durability == 'fsync' else 'NORMAL'))
+        with self.conn:
+            self.conn.execute("INSERT INTO notes_fts(notes_fts) VALUES ('optimize')")
+        return imported
+
+
+def _stamp_key(stamp):
+    """
+    Args:
+        stamp (tuple): (año, mes, día, hora, minuto)
+        
+    Returns:
+        int: Entero ordenable aaaammddHHMM
+    """
+    year, month, day, hour, minute = stamp
+    return (((year * 100 + month) * 100 + day) * 100 + hour) * 100 + minute
+
+
+NOTE_BACKENDS = {'text': TextNoteStore, 'sqlite': SqliteNoteStore}
+
+# Almacenes abiertos durante la sesión, uno por archivo de notas
+_note_stores = {}
+
+
+def configured_backend(file_path):
+    """
+    Backend de las notas cuando no se indica --backend.
+    
+    Se usa el último elegido con --backend; si nunca se eligió, notas.db si
+    existe (tras --import-text) y si no STORE_BACKEND.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        
+    Returns:
+        str: Clave de NOTE_BACKENDS
+    """
+    try:
+        with open(os.path.join(os.path.dirname(file_path), BACKEND_SETTING_NAME), encoding='utf-8') as f:
+            backend = f.read().strip()
+        if backend in NOTE_BACKENDS:
+            return backend
+    except OSError:
+        pass
+    if os.path.exists(os.path.splitext(file_path)[0] + SQLITE_DB_SUFFIX):
+        return 'sqlite'
+    return STORE_BACKEND
+
+
+def save_backend_setting(file_path, backend):
+    """
+    Recuerda el backend elegido con --backend para las siguientes invocaciones.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        backend (str): Clave de NOTE_BACKENDS
+    """
+    if configured_backend(file_path) == backend:
+        return
+    path = os.path.join(os.path.dirname(file_path), BACKEND_SETTING_NAME)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(backend + "\n")
+    except OSError as e:
+        print(f"Error al guardar el backend: {e}", file=sys.stderr)
+
+
+def get_note_store(file_path, backend=None, durability=None):
+    """
+    Obtiene el almacén de notas de la sesión, creándolo si no existe.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        backend (str): Backend si hay que crearlo (default: configured_backend)
+        durability (str): Política de durabilidad si hay que crearlo
+        
+    Returns:
+        NoteStore: Almacén compartido por lectura y escritura
+    """
+    store = _note_stores.get(file_path)
+    if store is None:
+        store_class = NOTE_BACKENDS[backend or configured_backend(file_path)]
+        store = store_class(file_path, durability or WRITE_DURABILITY)
+        _note_stores[file_path] = store
+    return store
+
+
+def run_import_text(file_path):
+    """
+    Importa el archivo de notas de texto en la base SQLite (--import-text).
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        
+    Returns:
+        int: Código de salida del proceso
+    """
+    if not notes_exist(file_path):
+        print("No hay notas guardadas aún. Usa 'notez' para empezar a escribir.")
+        return 1
+    store = SqliteNoteStore(file_path)
+    try:
+        started = time.perf_counter()
+        imported = store.import_text(file_path)
+    except ValueError as e:
+        print(f"Error al importar: {e}")
+        return 1
+    finally:
+        store.close()
+    elapsed = time.perf_counter() - started
+    # Desde ahora todos los modos usan la base importada
+    save_backend_setting(file_path, 'sqlite')
+    print(f"noteZ: {imported} líneas importadas en {store.db_path} ({elapsed:.1f}s)")
+    print("noteZ: las notas nuevas se guardan en SQLite (vuelve con --backend text)")
+    return 0
+
+
+class TimestampFormatter:
+    """
+    Genera el timestamp de las notas recalculándolo solo cuando cambia.
+    
+    strftime se llama una vez por minuto (o por segundo si el formato muestra
+    segundos); todas las notas de ese intervalo reutilizan el mismo texto.
+    """
+    
+    def __init__(self, fmt=None):
+        """
+        Args:
+            fmt (str): Formato strftime (default: TIMESTAMP_FORMAT)
+        """
+        self.format = fmt or TIMESTAMP_FORMAT
+        if '%f' in self.format:
+            self.resolution = 0  # Microsegundos: no se puede reutilizar
+        elif any(directive in self.format for directive in TIMESTAMP_SECOND_DIRECTIVES):
+            self.resolution = 1
+        else:
+            self.resolution = 60
+        self._key = None
+        self._text = ""
+    
+    def __call__(self):
+        """
+        Returns:
+            str: Timestamp de este momento según el formato
+        """
+        now = time.time()
+        if not self.resolution:
+            return datetime.fromtimestamp(now).strftime(self.format)
+        # Los husos horarios desplazan la hora en minutos enteros: el cambio de
+        # minuto local coincide con el de la época
+        key = int(now // self.resolution)
+        if key != self._key:
+            self._text = datetime.fromtimestamp(now).strftime(self.format)
+            self._key = key
+        return self._text
+
+
+class NoteWriter:
+    """
+    Writer único de las notas durante toda la sesión.
+    
+    Da formato a las notas (timestamp, separadores, marcas de fin de sesión)
+    y las guarda en el almacén de la sesión. Otros componentes (p. ej. el
+    panel del modo dual) pueden suscribirse para recibir cada bloque escrito.
+    """
+    
+    def __init__(self, store, timestamp=None):
+        """
+        Args:
+            store (NoteStore): Almacén donde se guardan las notas
+            timestamp (TimestampFormatter): Generador de timestamps (default: TIMESTAMP_FORMAT)
+        """
+        self.store = store
+        self.timestamp = timestamp or TimestampFormatter()
+        self.listeners = []
+    
+    def append(self, text):
+        """
+        Añade texto al final de las notas y avisa a los suscriptores.
+        
+        Args:
+            text (str): Texto a añadir (ya formateado, con saltos de línea)
+            
+        Returns:
+            tuple: (posición inicial, posición final) del bloque escrito
+        """
+        start, end = self.store.append(text)
+        for listener in self.listeners:
+            listener(text, start, end)
+        return start, end
+    
+    def sync(self):
+        """Fuerza a disco todo lo escrito hasta ahora."""
+        self.store.sync()
+    
+    def close(self):
+        """Cierra el almacén de la sesión."""
+        self.store.close()
+    
+    def write_batch(self, lines):
+        """
+        Escribe varias líneas de entrada en un único bloque (texto pegado).
+        Se aplican las mismas reglas que a una línea suelta: las vacías se
+        ignoran y /n y /n= generan sus separadores.
+        
+        Args:
+            lines (list): Líneas tal como las escribió/pegó el usuario
+            
+        Returns:
+            int: Número de líneas guardadas
+        """
+        timestamp = self.timestamp()
+        records = []
+        for line in lines:
+            if line == '/n':
+                records.append("\n")
+            elif line == '/n=':
+                records.append(f"{timestamp} {SEPARATOR_TEXT}\n")
+            elif line.strip():
+                records.append(f"{timestamp} {line}\n")
+        if records:
+            self.append("".join(records))
+        return len(records)
+    
+    def write_lines(self, lines):
+        """
+        Escribe líneas de texto como notas en un único bloque (ingesta por stdin).
+        A diferencia de write_batch, no interpreta comandos: el texto se guarda tal cual.
+        
+        Args:
+            lines (list): Líneas de texto sin salto de línea final
+            
+        Returns:
+            int: Número de líneas guardadas (las vacías se ignoran)
+        """
+        prefix = self.timestamp() + " "
+        records = [prefix + line + "\n" for line in lines if line.strip()]
+        if records:
+            self.append("".join(records))
+        return len(records)
+    
+    def write_note(self, text):
+        """Escribe una nota con timestamp."""
+        return self.append(f"{self.timestamp()} {text}\n")
+    
+    def write_blank(self):
+        """Escribe una línea vacía (separador mínimo, /n)."""
+        return self.append("\n")
+    
+    def write_separator(self):
+        """Escribe la línea decorativa (/n=)."""
+        return self.write_note(SEPARATOR_TEXT)
+    
+    def write_session_end(self):
+        """Escribe la línea de fin de sesión (/q)."""
+        return self.write_note(SESSION_END_TEXT)
+    
+    def write_interrupt(self):
+        """Escribe la línea de cierre por Ctrl+C."""
+        return self.write_note(INTERRUPT_TEXT)
+
+
+# Writers abiertos durante la sesión, uno por archivo de notas
+_note_writers = {}
+
+
+def get_note_writer(file_path, durability=None):
+    """
+    Obtiene el writer compartido de un archivo de notas, creándolo si no existe.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        durability (str): Política de durabilidad si hay que crear el almacén
+        
+    Returns:
+        NoteWriter: Writer de la sesión para ese archivo
+    """
+    writer = _note_writers.get(file_path)
+    if writer is None:
+        writer = NoteWriter(get_note_store(file_path, durability=durability))
+        _note_writers[file_path] = writer
+    return writer
+
+
+def close_note_writers():
+    """Cierra todos los writers y almacenes abiertos (fin de sesión)."""
+    _note_writers.clear()
+    while _note_stores:
+        _, store = _note_stores.popitem()
+        try:
+            store.close()
+        except OSError as e:
+            print(f"Error al guardar: {e}")
+
+
+# ============================================================================
+# INDEXACIÓN EN SEGUNDO PLANO
+# ============================================================================
+# Avisos de notas guardadas pendientes de indexar. Si la cola se llena se
+# descartan: el hilo indexa a partir del estado de los archivos, así que un
+# solo aviso basta para ponerse al día con todo lo anterior.
+INDEX_QUEUE_MAX = 1024
+
+
+class IndexWorker:
+    """
+    Hilo que mantiene los índices auxiliares (líneas y búsqueda) fuera del
+    camino de escritura.
+    
+    Al arrancar se pone al día con lo que otras sesiones escribieron sin
+    indexar; después agrupa los avisos de NoteWriter y actualiza los índices
+    una vez por tanda, de modo que guardar una nota nunca espera al índice.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, store):
+        """
+        Args:
+            store (NoteStore): Almacén cuyos índices se mantienen
+        """
+        self.store = store
+        self.queue = queue.Queue(maxsize=INDEX_QUEUE_MAX)
+        self._thread = None
+    
+    def start(self):
+        """Arranca el hilo (la primera pasada indexa lo pendiente)."""
+        if self._thread is not None:
+            return
+        self.store.background_indexing = True
+        self._thread = threading.Thread(target=self._run, name='notez-index', daemon=True)
+        self._thread.start()
+    
+    def notify(self, text, start, end):
+        """Listener de NoteWriter: avisa de un bloque recién guardado."""
+        try:
+            self.queue.put_nowait((start, end))
+        except queue.Full:
+            pass
+    
+    def _run(self):
+        """Bucle del hilo: una actualización por cada tanda de avisos."""
+        stopping = False
+        while not stopping:
+            self._update()
+            item = self.queue.get()
+            stopping = item is self._STOP
+            # Agrupar todo lo que llegó mientras se indexaba
+            while not stopping:
+                try:
+                    stopping = self.queue.get_nowait() is self._STOP
+                except queue.Empty:
+                    break
+        self._update()
+    
+    def _update(self):
+        """Actualiza los índices; un error no detiene el hilo (se reintenta con el siguiente aviso)."""
+        try:
+            self.store.update_indexes()
+        except (OSError, ValueError) as e:
+            print(f"Error al indexar: {e}")
+    
+    def stop(self):
+        """Termina de indexar lo pendiente y detiene el hilo."""
+        if self._thread is None:
+            return
+        self.queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+        self.store.background_indexing = False
+
+
+# ============================================================================
+# ENTRADA DE TEXTO PEGADO (ráfagas de líneas)
+# ============================================================================
+# Comandos que cambian de modo o muestran algo: cortan una ráfaga pegada
+CONTROL_COMMANDS = {'/q', '/r', '/h', '/stats', '/hide', '/dual', '/normal'}
+# Espera máxima entre líneas de una misma ráfaga pegada (segundos)
+PASTE_BURST_TIMEOUT = 0.01
+# Límite de líneas por bloque para mantener acotada la memoria
+PASTE_BURST_MAX_LINES = 50000
+
+
+def is_search_command(line):
+    """
+    Indica si la línea es el comando de búsqueda (/s o /s términos).
+    
+    Args:
+        line (str): Línea introducida por el usuario
+        
+    Returns:
+        bool: True si es una búsqueda
+    """
+    return line == '/s' or line.startswith('/s ')
+
+
+def is_control_command(line):
+    """
+    Indica si la línea es un comando de control (no se guarda como nota).
+    
+    Args:
+        line (str): Línea introducida por el usuario
+        
+    Returns:
+        bool: True si es un comando de control
+    """
+    return line in CONTROL_COMMANDS or is_search_command(line)
+
+
+# Líneas ya leídas de stdin que quedan por procesar (comandos dentro de una ráfaga)
+_pending_input = deque()
+
+
+def stdin_has_pending_data(timeout=PASTE_BURST_TIMEOUT):
+    """
+    Indica si stdin tiene más datos listos, como ocurre al pegar varias líneas.
+    
+    Args:
+        timeout (float): Segundos a esperar por datos adicionales
+        
+    Returns:
+        bool: True si hay datos disponibles sin bloquear
+    """
+    try:
+        if sys.platform == 'win32':
+            import msvcrt
+            if msvcrt.kbhit():
+                return True
+            time.sleep(timeout)
+            return msvcrt.kbhit()
+        import select
+        ready, _, _ = select.select([sys.stdin], [], [], timeout)
+        return bool(ready)
+    except (OSError, ValueError):
+        # stdin cerrado o no seleccionable: tratar como entrada línea a línea
+        return False
+
+
+def read_note_input(prompt, read_line=input):
+    """
+    Lee la próxima entrada del usuario detectando texto pegado.
+    
+    Si tras una nota quedan más líneas esperando en stdin, se recogen todas
+    para guardarlas juntas en una sola escritura. Los comandos de control que
+    aparezcan en la ráfaga quedan en cola y se devuelven en llamadas siguientes.
+    
+    Args:
+        prompt (str): Prompt a mostrar
+        read_line (callable): Función que lee una línea mostrando el prompt
+        
+    Returns:
+        list: Una sola línea (nota o comando) o varias líneas de nota pegadas
+    """
+    first = _pending_input.popleft() if _pending_input else read_line(prompt)
+    if is_control_command(first):
+        return [first]
+    
+    lines = [first]
+    while _pending_input and not is_control_command(_pending_input[0]):
+        lines.append(_pending_input.popleft())
+    
+    if not _pending_input:
+        # Con readline cargado, input() lee el terminal directamente: el resto
+        # de la ráfaga se lee igual, porque el buffer de sys.stdin escondería
+        # las líneas siguientes a stdin_has_pending_data()
+        use_read_line = 'readline' in sys.modules
+        while len(lines) < PASTE_BURST_MAX_LINES and stdin_has_pending_data():
+            if use_read_line:
+                try:
+                    line = read_line("")
+                except EOFError:
+                    break
+            else:
+                line = sys.stdin.readline()
+                if not line:
+                    break
+            line = line.rstrip('\r\n')
+            if is_control_command(line):
+                # El comando y lo que venga detrás se procesan después del bloque
+                _pending_input.append(line)
+                break
+            lines.append(line)
+    return lines
+
+
+# ============================================================================
+# INGESTA NO INTERACTIVA (stdin / pipes)
+# ============================================================================
+# Caracteres leídos de stdin por bloque en modo ingesta
+INGEST_CHUNK_SIZE = 1024 * 1024
+
+
+def ingest_stream(stream, writer, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Guarda como notas todas las líneas de un stream, sin interfaz interactiva.
+    
+    Cada lectura devuelve lo que ya está disponible (hasta chunk_size bytes)
+    y sus líneas completas se guardan en una sola operación: con una entrada
+    lenta (`tail -f`) cada línea se guarda al llegar, con su hora; con una
+    rápida se escriben bloques grandes. Si se interrumpe (Ctrl+C), la línea
+    a medias también se guarda.
+    
+    Args:
+        stream: Stream binario a consumir (p. ej. sys.stdin.buffer)
+        writer (NoteWriter): Writer de la sesión
+        chunk_size (int): Bytes leídos como máximo por bloque
+        
+    Returns:
+        int: Número de notas guardadas
+    """
+    # UTF-8 tolerante: un carácter partido entre dos lecturas se completa en la siguiente
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    read = getattr(stream, 'read1', stream.read)
+    total = 0
+    remainder = ''
+    try:
+        while True:
+            chunk = read(chunk_size)
+            if not chunk:
+                break
+            lines = (remainder + decoder.decode(chunk)).split('\n')
+            # La última línea puede estar incompleta hasta el siguiente bloque
+            remainder = lines.pop()
+            total += writer.write_lines([line.rstrip('\r') for line in lines])
+    finally:
+        remainder += decoder.decode(b'', final=True)
+        if remainder.rstrip('\r'):
+            total += writer.write_lines([remainder.rstrip('\r')])
+    return total
+
+
+def run_ingest_mode(file_path):
+    """
+    Ejecuta el modo ingesta: lee stdin hasta EOF y guarda cada línea con timestamp.
+    Pensado para scripts y pipes (p. ej. `comando | notez --ingest`).
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+    """
+    writer = get_note_writer(file_path)
+    try:
+        total = ingest_stream(sys.stdin.buffer, writer)
+    except KeyboardInterrupt:
+        print("noteZ: ingesta interrumpida", file=sys.stderr)
+        return
+    print(f"noteZ: {total} líneas guardadas en {writer.store.location}", file=sys.stderr)
+
+
+# ============================================================================
+# NÚCLEO ASÍNCRONO DE LOS MODOS INTERACTIVOS
+# ============================================================================
+# Los modos grabación, hide y dual son corrutinas sobre un bucle asyncio que
+# multiplexa la entrada del usuario (leída en un hilo para conservar la
+# edición de línea de input()), el redimensionado del terminal, los avisos
+# del vigilante de archivos y los temporizadores de mantenimiento.
+# Cada cuánto se comprueba si hay notas pendientes de fsync (durabilidad 'interval')
+SESSION_FLUSH_INTERVAL = WRITE_FSYNC_INTERVAL_MS / 1000
+# Sondeo del tamaño del terminal donde no existe SIGWINCH (Windows)
+SESSION_RESIZE_POLL_INTERVAL = 0.5
+
+
+class InteractiveSession:
+    """
+    Bucle de eventos compartido por los modos interactivos de una sesión.
+    
+    Todo lo que toca la pantalla o el writer se ejecuta en el hilo principal
+    (el del bucle); el hilo de entrada solo lee líneas de stdin.
+    """
+    
+    def __init__(self, writer):
+        """
+        Args:
+            writer (NoteWriter): Writer de la sesión (para los temporizadores de flush)
+        """
+        import asyncio
+        self.writer = writer
+        self.loop = asyncio.new_event_loop()
+        # Con readline, input() guarda lo tecleado en un buffer que redraw_prompt
+        # puede reescribir tras un repintado completo (Windows no lo tiene)
+        try:
+            import readline
+            # El texto pegado debe seguir llegando línea a línea (read_note_input)
+            readline.parse_and_bind('set enable-bracketed-paste off')
+        except ImportError:
+            readline = None
+        self._readline = readline
+        # Función sin argumentos que el modo activo registra para repintar al redimensionar
+        self.on_resize = None
+        self._requests = queue.Queue()
+        self._input_thread = None
+        self._input_future = None
+        self._prompt = ""
+        self._timers = []
+        self._terminal_size = get_terminal_size()
+        # Los índices se mantienen en otro hilo: guardar una nota no los espera
+        self.indexer = IndexWorker(writer.store)
+        writer.listeners.append(self.indexer.notify)
+        self.indexer.start()
+        self._add_timer(SESSION_FLUSH_INTERVAL, self._flush_pending)
+        try:
+            self.loop.add_signal_handler(signal.SIGWINCH, self._handle_resize)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            self._add_timer(SESSION_RESIZE_POLL_INTERVAL, self._poll_resize)
+    
+    def run(self, coro):
+        """
+        Ejecuta un modo (corrutina) hasta que termina.
+        Un Ctrl+C mientras se espera una línea se entrega al modo como
+        KeyboardInterrupt en el `await`, igual que con un input() bloqueante.
+        
+        Args:
+            coro: Corrutina del modo
+            
+        Returns:
+            El resultado del modo (próximo estado)
+        """
+        task = self.loop.create_task(coro)
+        while True:
+            try:
+                return self.loop.run_until_complete(task)
+            except KeyboardInterrupt:
+                future = self._input_future
+                if task.done() or future is None or future.done():
+                    raise
+                future.set_exception(KeyboardInterrupt())
+    
+    async def read_input(self, prompt, read_line=input):
+        """
+        Espera la siguiente entrada del usuario sin bloquear el bucle.
+        
+        Args:
+            prompt (str): Prompt a mostrar
+            read_line (callable): Función de lectura de una línea (ver read_note_input)
+            
+        Returns:
+            list: Líneas introducidas (más de una si se pegó texto)
+        """
+        if self._input_thread is None:
+            self._input_thread = threading.Thread(
+                target=self._input_worker, name='notez-input', daemon=True
+            )
+            self._input_thread.start()
+        self._prompt = prompt
+        self._input_future = self.loop.create_future()
+        self._requests.put((prompt, read_line, self._input_future))
+        try:
+            return await self._input_future
+        finally:
+            self._input_future = None
+    
+    def _input_worker(self):
+        """Hilo de entrada: atiende cada petición de read_input() con read_note_input()."""
+        while True:
+            prompt, read_line, future = self._requests.get()
+            try:
+                lines = read_note_input(prompt, read_line)
+            except BaseException as e:
+                self.loop.call_soon_threadsafe(_resolve_future, future, None, e)
+                if not isinstance(e, (EOFError, KeyboardInterrupt)):
+                    return
+            else:
+                self.loop.call_soon_threadsafe(_resolve_future, future, lines, None)
+    
+    def redraw_prompt(self):
+        """Vuelve a escribir el prompt (y lo tecleado, si hay readline) tras un repintado."""
+        if self._input_future is None:
+            return
+        typed = self._readline.get_line_buffer() if self._readline else ""
+        write_terminal(self._prompt + typed)
+    
+    def call_threadsafe(self, callback):
+        """
+        Devuelve una versión de `callback` que, llamada desde otro hilo
+        (p. ej. NotesWatcher), se ejecuta en el hilo del bucle.
+        """
+        def schedule():
+            if not self.loop.is_closed():
+                self.loop.call_soon_threadsafe(callback)
+        return schedule
+    
+    def _add_timer(self, interval, callback):
+        """Ejecuta `callback` cada `interval` segundos mientras corre un modo."""
+        import asyncio
+        
+        async def repeat():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    callback()
+                except Exception:
+                    pass
+        self._timers.append(self.loop.create_task(repeat()))
+    
+    def _flush_pending(self):
+        """Completa el fsync pendiente de la durabilidad 'interval' sin esperar a otra nota."""
+        self.writer.store.flush_pending()
+    
+    def _handle_resize(self):
+        self._terminal_size = get_terminal_size()
+        if self.on_resize is not None:
+            self.on_resize()
+    
+    def _poll_resize(self):
+        if get_terminal_size() != self._terminal_size:
+            self._handle_resize()
+    
+    def close(self):
+        """
+        Detiene temporizadores, termina la indexación pendiente y cierra el
+        bucle (el hilo de entrada es daemon).
+        """
+        import asyncio
+        for timer in self._timers:
+            timer.cancel()
+        if self._timers:
+            self.loop.run_until_complete(asyncio.gather(*self._timers, return_exceptions=True))
+        self.writer.listeners.remove(self.indexer.notify)
+        self.indexer.stop()
+        self.loop.close()
+
+
+def _resolve_future(future, result, error):
+    """Entrega al bucle el resultado del hilo de entrada (si nadie lo canceló antes)."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def write_line(line, file_path):
+    """
+    Escribe una línea al archivo con timestamp automático y maneja comandos especiales.
+    
+    Args:
+        line (str): Línea de texto a escribir o comando especial
+        file_path (str): Ruta completa al archivo de notas
+        
+    Returns:
+        str: Acción a tomar ('quit', 'read', 'hide', 'dual', 'normal', 'continue')
+    """
+    writer = get_note_writer(file_path)
+    
+    # Manejar comandos especiales
+    if line == '/q':
+        # Escribir línea decorativa final y salir
+        try:
+            writer.write_session_end()
+        except Exception as e:
+            print(f"Error al guardar: {e}")
+        return 'quit'
+        
+    elif line == '/r':
+        # Activar modo lectura temporal
+        return 'read'
+        
+    elif line == '/n':
+        # Línea vacía como separador mínimo
+        try:
+            writer.write_blank()
+        except Exception as e:
+            print(f"Error al guardar: {e}")
+        return 'continue'
+        
+    elif line == '/n=':
+        # Línea decorativa con separador
+        try:
+            writer.write_separator()
+        except Exception as e:
+            print(f"Error al guardar: {e}")
+        return 'continue'
+        
+    elif line == '/h':
+        # Mostrar ayuda y continuar
+        show_help()
+        return 'continue'
+        
+    elif line == '/stats':
+        # Latencias de la sesión (con --stats)
+        show_stats()
+        return 'continue'
+        
+    elif is_search_command(line):
+        # Buscar en las notas (/s términos) y continuar
+        run_search(file_path, line[2:], return_to_recording=True)
+        return 'continue'
+        
+    elif line == '/hide':
+        # Activar modo hide
+        return 'hide'
+
+    elif line == '/dual':
+        # Activar modo dual
+        return 'dual'
+
+    elif line == '/normal':
+        # Ya estamos en modo normal (grabación), pero retornamos explícitamente
+        print("(Ya estás en modo normal)")
+        return 'continue'
+        
+    else:
+        # Línea normal de nota con timestamp
+        if line.strip():  # Solo escribir si no está vacía
+            try:
+                writer.write_note(line)
+            except Exception as e:
+                print(f"Error al guardar: {e}")
+        return 'continue'
+
+
+# ============================================================================
+# LECTURA EFICIENTE DESDE EL FINAL DEL ARCHIVO
+# ============================================================================
+# Tamaño de bloque usado para leer el archivo de notas hacia atrás
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_lines_reverse(file_path, end_offset=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    Recorre las líneas del archivo desde el final hacia el inicio.
+    Lee bloques de tamaño fijo buscando desde EOF, por lo que la memoria
+    usada depende solo del bloque actual y no del tamaño del archivo.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        end_offset (int): Byte donde termina la lectura (default: EOF)
+        chunk_size (int): Bytes leídos por cada bloque
+        
+    Yields:
+        str: Cada línea (sin salto de línea), empezando por la última
+    """
+    with open_notes(file_path) as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell() if end_offset is None else min(end_offset, f.tell())
+        has_data = pos > 0
+        remainder = b''
+        first_block = True
+        
+        while pos > 0:
+            read_size = min(chunk_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            block = f.read(read_size) + remainder
+            
+            if first_block:
+                # El salto de línea final no abre una línea nueva
+                if block.endswith(b'\n'):
+                    block = block[:-1]
+                first_block = False
+            
+            # El primer fragmento puede ser una línea incompleta: se conserva
+            # hasta leer el bloque anterior
+            parts = block.split(b'\n')
+            remainder = parts[0]
+            for part in reversed(parts[1:]):
+                yield part.decode('utf-8', errors='replace')
+        
+        if has_data:
+            yield remainder.decode('utf-8', errors='replace')
+
+
+# Paginación del modo lectura
+READ_PAGE_LINES = 10
+READ_SCROLL_LINES = 5
+
+
+def read_notes(file_path, return_to_recording=False, focus_line=None):
+    """
+    Modo lectura interactivo con paginación de acceso aleatorio.
+    Muestra las últimas 10 líneas inicialmente y +5 hacia atrás por cada
+    Enter; además permite saltar al inicio o al final, pasar páginas y ir a
+    una línea, un porcentaje o una fecha. Cada página se localiza por su
+    offset en el índice de líneas, así que abrir un archivo enorme es
+    inmediato y solo se mantiene en memoria lo que se muestra en pantalla.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        return_to_recording (bool): Si True, indica que debe volver al modo grabación al salir
+        focus_line (int): Si se indica, la primera página se centra en esa línea
+            (p. ej. un resultado de búsqueda) y la paginación continúa desde ahí
+    """
+    store = get_note_store(file_path)
+    if not store.exists():
+        print("No hay notas guardadas aún. Usa 'notez' para empezar a escribir.")
+        return
+    
+    def print_lines(first, last, focus=None):
+        """Muestra las líneas first..last numeradas, marcando la línea enfocada."""
+        for i, line in enumerate(store.iter_lines(first, last), start=first):
+            marker = "▶" if i == focus else "│"
+            print(f"{i:4d} {marker} {line.rstrip()}")
+        return first, last
+    
+    def page_around(line_number):
+        """Página que muestra una línea cerca del centro (como los resultados de búsqueda)."""
+        last = min(total_lines, max(line_number, 1) + READ_PAGE_LINES // 2 - 1)
+        return max(1, last - READ_PAGE_LINES + 1), last
+    
+    try:
+        total_lines = store.line_count()
+        if not total_lines:
+            print("El archivo de notas está vacío.")
+            return
+    except Exception as e:
+        print(f"Error al leer archivo: {e}")
+        return
+    
+    context_info = " (desde grabación)" if return_to_recording else ""
+    print(f"\n╭── noteZ READ MODE{context_info} ── {total_lines} líneas totales ──╮")
+    
+    # Mostrar las últimas 10 líneas (o la página de la línea enfocada)
+    try:
+        first, last = print_lines(*page_around(focus_line or total_lines), focus_line)
+    except Exception as e:
+        print(f"Error al leer archivo: {e}")
+        return
+    
+    while True:
+        position = f"{first}-{last}/{total_lines} ({last * 100 // total_lines}%)"
+        if first <= 1:
+            prompt = f"[noteZ READ MODE] {position} -- Inicio del archivo -- + / - página, /h ayuda, /q para salir --"
+        else:
+            prompt = f"[noteZ READ MODE] {position} -- Enter para más, + / - página, /h ayuda, /q para salir --"
+        
+        try:
+            command = input(f"\n{prompt} ").strip()
+            # Otras sesiones pueden seguir añadiendo notas mientras se lee
+            total_lines = store.line_count() or total_lines
+            focus = None
+            
+            if command == '/q':
+                break
+            elif command == '/h':
+                show_help()
+                continue
+            elif command == '/i':
+                target = (1, min(total_lines, READ_PAGE_LINES))
+            elif command == '/f':
+                target = (max(1, total_lines - READ_PAGE_LINES + 1), total_lines)
+            elif command == '-':
+                target = (max(1, first - READ_PAGE_LINES), first - 1)
+            elif command == '+':
+                target = (last + 1, min(total_lines, last + READ_PAGE_LINES))
+            elif command.isdigit():
+                # Ir a la línea N
+                focus = min(max(int(command), 1), total_lines)
+                target = page_around(focus)
+            elif command.endswith('%') and command[:-1].strip().isdigit():
+                # Ir a un porcentaje del archivo
+                percent = min(int(command[:-1]), 100)
+                focus = max(1, -(-total_lines * percent // 100))
+                target = page_around(focus)
+            elif command.startswith('/d'):
+                # Saltar a la primera nota de una fecha (dd-mm-aaaa [HH:MM])
+                try:
+                    focus = store.find_line_by_time(parse_date_arg(command[2:]))
+                except ValueError as e:
+                    print(f"\n{e}")
+                    continue
+                if focus > total_lines:
+                    print("\n── No hay notas desde esa fecha ──")
+                    continue
+                target = page_around(focus)
+            elif not command:
+                # Mostrar 5 líneas adicionales hacia atrás
+                target = (max(1, first - READ_SCROLL_LINES), first - 1)
+            else:
+                print("\n── Comando no reconocido (/h para ver la ayuda) ──")
+                continue
+            
+            if target[0] > target[1]:
+                if target[0] > total_lines:
+                    print("\n── Ya estás en el final del archivo ──")
+                else:
+                    print("\n── Ya estás en el inicio del archivo ──")
+                continue
+            print()  # Línea en blanco para separación
+            try:
+                first, last = print_lines(*target, focus)
+            except Exception as e:
+                print(f"Error al leer archivo: {e}")
+                break
+                    
+        except (KeyboardInterrupt, EOFError):
+            print("\n\n¡Hasta luego!")
+            break
+    
+    if return_to_recording:
+        print("\nVolviendo al modo grabación...")
+    else:
+        print("\nSaliendo del modo lectura...")
+
+
+# ============================================================================
+# CONSULTAS POR FECHA (búsqueda binaria sobre los timestamps)
+# ============================================================================
+# Las notas se añaden en orden cronológico, así que el timestamp de cada línea
+# es monótono y se puede localizar una fecha con búsqueda binaria usando el
+# índice de líneas, sin recorrer el archivo.
+# Formato clásico [dd-mm-aaaa | HH:MM] o ISO-8601 [aaaa-mm-ddTHH:MM[:SS]]
+LINE_TIMESTAMP_RE = re.compile(
+    rb'^\[(?:(\d{2})-(\d{2})-(\d{4}) \| (\d{2}):(\d{2})'
+    rb'|(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})(?::\d{2})?)\]'
+)
+# Líneas sin timestamp (separadores /n) a saltar como máximo al buscar uno
+TIMESTAMP_SCAN_LIMIT = 1000
+
+
+def parse_line_timestamp(raw_line):
+    """
+    Extrae el timestamp del inicio de una línea de notas.
+    
+    Args:
+        raw_line (bytes): Línea tal como está en el archivo
+        
+    Returns:
+        tuple: (año, mes, día, hora, minuto) o None si la línea no tiene timestamp
+    """
+    match = LINE_TIMESTAMP_RE.match(raw_line)
+    if not match:
+        return None
+    groups = match.groups()
+    if groups[0] is not None:
+        day, month, year, hour, minute = (int(g) for g in groups[:5])
+    else:
+        year, month, day, hour, minute = (int(g) for g in groups[5:])
+    return year, month, day, hour, minute
+
+
+def parse_date_arg(text, end_of_day=False):
+    """
+    Interpreta una fecha escrita por el usuario.
+    Acepta 'dd-mm-aaaa', 'aaaa-mm-dd' y opcionalmente ' HH:MM'.
+    
+    Args:
+        text (str): Fecha a interpretar
+        end_of_day (bool): Si no se indica hora, usar 23:59 en lugar de 00:00
+        
+    Returns:
+        tuple: (año, mes, día, hora, minuto)
+        
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    text = text.strip()
+    for fmt in ('%d-%m-%Y %H:%M', '%Y-%m-%d %H:%M', '%d-%m-%Y', '%Y-%m-%d'):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if '%H' not in fmt and end_of_day:
+            parsed = parsed.replace(hour=23, minute=59)
+        return parsed.year, parsed.month, parsed.day, parsed.hour, parsed.minute
+    raise ValueError(f"Fecha no válida: '{text}' (usa dd-mm-aaaa o dd-mm-aaaa HH:MM)")
+
+
+def find_line_by_time(file_path, when, after=False):
+    """
+    Localiza la primera línea con timestamp posterior (o igual) a una fecha.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        when (tuple): Fecha como (año, mes, día, hora, minuto)
+        after (bool): Si True, busca la primera línea estrictamente posterior
+        
+    Returns:
+        int: Número de línea (1-indexed); total + 1 si no hay ninguna
+    """
+    index = LineIndex(file_path)
+    total = index.line_count()
+    
+    with open_notes(file_path) as f:
+        def stamp_from(line_number):
+            """Timestamp de la línea o, si no tiene, de la siguiente que lo tenga."""
+            f.seek(index.line_offset(line_number))
+            for _ in range(TIMESTAMP_SCAN_LIMIT):
+                raw = f.readline()
+                if not raw:
+                    return None
+                stamp = parse_line_timestamp(raw)
+                if stamp:
+                    return stamp
+            return None
+        
+        lo, hi = 1, total + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            stamp = stamp_from(mid)
+            # Sin timestamp hasta el final: se considera posterior a cualquier fecha
+            if stamp is None or stamp > when or (stamp == when and not after):
+                hi = mid
+            else:
+                lo = mid + 1
+    return lo
+
+
+def print_date_range(file_path, since=None, until=None):
+    """
+    Muestra las notas entre dos fechas (modo --since / --until).
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        since (tuple): Fecha inicial incluida, o None para desde el inicio
+        until (tuple): Fecha final incluida, o None para hasta el final
+    """
+    store = get_note_store(file_path)
+    if not store.exists():
+        print("No hay notas guardadas aún. Usa 'notez' para empezar a escribir.")
+        return
+    
+    first = store.find_line_by_time(since) if since else 1
+    last = store.find_line_by_time(until, after=True) - 1 if until else store.line_count()
+    count = max(0, last - first + 1)
+    print(f"\n╭── noteZ FECHAS ── {count} líneas ──╮")
+    if not count:
+        print("│ (Sin notas en ese rango)")
+        return
+    
+    for line_number, line in enumerate(store.iter_lines(first, last), start=first):
+        print(f"{line_number:4d} │ {line}")
+
+
+# ============================================================================
+# EXPORTACIÓN (--export: JSON Lines, CSV, Markdown)
+# ============================================================================
+# Tubería de generadores: líneas del almacén → registros → texto de salida.
+# Cada registro se escribe en cuanto se genera, así que la memoria no crece
+# con el tamaño de las notas.
+EXPORT_FORMATS = ('jsonl', 'csv', 'md')
+EXPORT_FIELDS = ('line', 'timestamp', 'kind', 'text')
+# Timestamp clásico o ISO-8601 (como LINE_TIMESTAMP_RE) seguido del texto
+NOTE_RECORD_RE = re.compile(
+    r'^\[(?:(\d{2})-(\d{2})-(\d{4}) \| (\d{2}):(\d{2})'
+    r'|(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})(:\d{2})?)\] ?(.*)$',
+    re.DOTALL
+)
+# Tipo de registro de las líneas especiales que escribe write_line
+MARKER_KINDS = {
+    SEPARATOR_TEXT: 'separator',
+    SESSION_END_TEXT: 'session_end',
+    INTERRUPT_TEXT: 'interrupt',
+}
+
+
+def iter_note_records(lines, first_line=1):
+    """
+    Interpreta las líneas de notas como registros estructurados.
+    
+    Args:
+        lines: Iterable de líneas sin salto de línea (p. ej. store.iter_lines)
+        first_line (int): Número de la primera línea
+        
+    Yields:
+        dict: line, timestamp (ISO 'aaaa-mm-ddTHH:MM[:SS]' o None), kind
+            ('note', 'separator', 'session_end', 'interrupt', 'blank' o
+            'text' si no tiene timestamp) y text (sin el timestamp)
+    """
+    for line_number, line in enumerate(lines, start=first_line):
+        match = NOTE_RECORD_RE.match(line)
+        if match:
+            groups = match.groups()
+            text = groups[-1]
+            if groups[0] is not None:
+                day, month, year, hour, minute = groups[:5]
+                timestamp = f"{year}-{month}-{day}T{hour}:{minute}"
+            else:
+                timestamp = "{}-{}-{}T{}:{}{}".format(*groups[5:10], groups[10] or "")
+            kind = MARKER_KINDS.get(text, 'note')
+        else:
+            timestamp, text = None, line
+            kind = 'text' if line.strip() else 'blank'
+        yield {'line': line_number, 'timestamp': timestamp, 'kind': kind, 'text': text}
+
+
+def export_jsonl(records):
+    """Yields: str: Un objeto JSON por registro."""
+    import json
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def export_csv(records):
+    """Yields: str: Cabecera y una fila CSV por registro."""
+    import csv
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_FIELDS)
+    for record in records:
+        writer.writerow([record[field] for field in EXPORT_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_markdown(records):
+    """Yields: str: Notas agrupadas por día, con los marcadores de sesión como reglas."""
+    current_day = None
+    for record in records:
+        timestamp, kind, text = record['timestamp'], record['kind'], record['text']
+        if timestamp and timestamp[:10] != current_day:
+            current_day = timestamp[:10]
+            year, month, day = current_day.split('-')
+            yield f"\n## {day}-{month}-{year}\n\n"
+        if kind == 'note':
+            yield f"- **{timestamp[11:]}** {text}\n"
+        elif kind == 'separator':
+            yield "\n---\n\n"
+        elif kind == 'session_end':
+            yield f"\n*Sesión finalizada ({timestamp[11:]})*\n\n---\n"
+        elif kind == 'interrupt':
+            yield f"\n*Interrupción del usuario ({timestamp[11:]})*\n\n---\n"
+        elif kind == 'text':
+            yield f"- {text}\n"
+        else:
+            yield "\n"
+
+
+EXPORTERS = {'jsonl': export_jsonl, 'csv': export_csv, 'md': export_markdown}
+
+
+def run_export(file_path, export_format, since=None, until=None, out=None):
+    """
+    Exporta las notas (opcionalmente un rango de fechas) de forma incremental.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        export_format (str): Uno de EXPORT_FORMATS
+        since (tuple): Fecha inicial incluida, o None para desde el inicio
+        until (tuple): Fecha final incluida, o None para hasta el final
+        out: Flujo de texto de salida (default: stdout)
+        
+    Returns:
+        int: Número de líneas exportadas
+    """
+    out = out or sys.stdout
+    store = get_note_store(file_path)
+    if not store.exists():
+        # Los mensajes van a stderr para no mezclarse con la exportación
+        print("No hay notas guardadas aún. Usa 'notez' para empezar a escribir.", file=sys.stderr)
+        return 0
+    
+    first = store.find_line_by_time(since) if since else 1
+    last = store.find_line_by_time(until, after=True) - 1 if until else store.line_count()
+    if last < first:
+        return 0
+    records = iter_note_records(store.iter_lines(first, last), first)
+    for chunk in EXPORTERS[export_format](records):
+        out.write(chunk)
+    out.flush()
+    return last - first + 1
+
+
+# ============================================================================
+# BÚSQUEDA DE TEXTO (índice invertido junto al archivo de notas)
+# ============================================================================
+# El índice principal (.sidx) es un archivo binario ordenado por término que
+# se consulta con búsqueda binaria. Las líneas nuevas se añaden primero a un
+# log de texto (.sidx.log) y se fusionan con el principal al crecer el log.
+SEARCH_INDEX_SUFFIX = '.sidx'
+SEARCH_LOG_SUFFIX = '.sidx.log'
+SEARCH_INDEX_MAGIC = b'NZSIDX02'
+# Cabecera: magic, bytes indexados, líneas indexadas, número de términos y la
+# firma de las notas (tamaño, mtime_ns) en la última actualización
+SEARCH_INDEX_HEADER = struct.Struct('<8sQQQQq')
+# Vocabulario: offset del término, longitud del término, nº de líneas, offset de las líneas
+SEARCH_VOCAB_ENTRY = struct.Struct('<QIIQ')
+# Líneas en el log antes de fusionarlo con el índice principal
+SEARCH_LOG_COMPACT_LINES = 20000
+# Resultados mostrados como máximo (los más recientes)
+SEARCH_MAX_RESULTS = 50
+
+TIMESTAMP_PREFIX_RE = re.compile(
+    r'^\[(?:\d{2}-\d{2}-\d{4} \| \d{2}:\d{2}|\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(?::\d{2})?)\] ?'
+)
+TOKEN_RE = re.compile(r'\w+')
+# Búsqueda insensible a acentos: "sesion" encuentra "sesión"
+_ACCENT_FOLD = dict(zip('áàäâãéèëêíìïîóòöôõúùüûñç', 'aaaaaeeeeiiiiooooouuuunc'))
+_ACCENT_RE = re.compile('[' + ''.join(_ACCENT_FOLD) + ']')
+
+
+def tokenize(text):
+    """
+    Extrae los términos buscables de una línea (sin el timestamp).
+    
+    Args:
+        text (str): Línea de notas o consulta de búsqueda
+        
+    Returns:
+        set: Términos normalizados (minúsculas, sin acentos)
+    """
+    match = TIMESTAMP_PREFIX_RE.match(text)
+    if match:
+        text = text[match.end():]
+    text = text.lower()
+    if not text.isascii():
+        text = _ACCENT_RE.sub(lambda m: _ACCENT_FOLD[m.group()], text)
+    return set(TOKEN_RE.findall(text))
+
+
+class SearchIndex:
+    """
+    Índice invertido persistente (término → números de línea).
+    
+    Se actualiza de forma incremental indexando solo los bytes añadidos al
+    archivo de notas desde la última actualización. Si el archivo fue
+    editado por fuera (las líneas ya indexadas no coinciden), se reconstruye.
+    """
+    
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path (str): Ruta completa al archivo de notas
+        """
+        self.file_path = file_path
+        self.index_path = file_path + SEARCH_INDEX_SUFFIX
+        self.log_path = file_path + SEARCH_LOG_SUFFIX
+    
+    def _read_header(self):
+        """
+        Lee la cabecera del índice principal.
+        
+        Returns:
+            tuple: (bytes, líneas, términos, tamaño firmado, mtime_ns firmado) o None si no es válida
+        """
+        try:
+            with open(self.index_path, 'rb') as f:
+                raw = f.read(SEARCH_INDEX_HEADER.size)
+        except OSError:
+            return None
+        if len(raw) != SEARCH_INDEX_HEADER.size:
+            return None
+        magic, *header = SEARCH_INDEX_HEADER.unpack(raw)
+        if magic != SEARCH_INDEX_MAGIC:
+            return None
+        return tuple(header)
+    
+    def _main_coverage(self):
+        """
+        Returns:
+            tuple: (bytes indexados, líneas indexadas, términos) del índice principal
+        """
+        header = self._read_header()
+        return (0, 0, 0) if header is None else header[:3]
+    
+    def _save_signature(self, signature):
+        """
+        Guarda en la cabecera la firma de las notas que cubre el índice.
+        
+        Args:
+            signature (tuple): (tamaño, mtime_ns) según notes_signature()
+        """
+        header = self._read_header()
+        if header is None:
+            # Solo hay log (o nada): un índice principal vacío que lo preceda
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(SEARCH_INDEX_HEADER.pack(SEARCH_INDEX_MAGIC, 0, 0, 0, *signature))
+            os.replace(tmp_path, self.index_path)
+            return
+        with open(self.index_path, 'r+b') as f:
+            f.write(SEARCH_INDEX_HEADER.pack(SEARCH_INDEX_MAGIC, *header[:3], *signature))
+    
+    def is_fresh(self):
+        """
+        Returns:
+            bool: True si las notas no cambiaron desde la última actualización
+        """
+        header = self._read_header()
+        return header is not None and header[3:] == notes_signature(self.file_path)
+    
+    def refresh_signature(self):
+        """
+        Actualiza la firma de un índice vigente tras una rotación de segmento,
+        que no cambia ninguna línea pero sí el mtime del segmento activo.
+        """
+        lock = FileLock(self.index_path + LOCK_SUFFIX)
+        try:
+            with lock:
+                header = self._read_header()
+                signature = notes_signature(self.file_path)
+                if header is not None and header[3] == signature[0]:
+                    self._save_signature(signature)
+        finally:
+            lock.close()
+    
+    def coverage(self):
+        """
+        Returns:
+            tuple: (bytes indexados, líneas indexadas) entre índice principal y log
+        """
+        if os.path.exists(self.log_path):
+            for record in iter_lines_reverse(self.log_path):
+                if record:
+                    line_no, end_offset, _ = record.split('\t', 2)
+                    return int(end_offset), int(line_no)
+        size, lines, _ = self._main_coverage()
+        return size, lines
+    
+    def _is_consistent(self, covered_size, covered_lines):
+        """Comprueba que lo indexado sigue coincidiendo con el archivo de notas."""
+        if covered_lines == 0:
+            return covered_size == 0
+        return LineIndex(self.file_path).line_offset(covered_lines + 1) == covered_size
+    
+    def clear(self):
+        """Elimina el índice (se reconstruirá en la próxima actualización)."""
+        for path in (self.index_path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def update(self, batch_lines=1000000):
+        """
+        Indexa las líneas añadidas al archivo de notas desde la última vez.
+        
+        Las actualizaciones pequeñas se añaden al log; cuando el log supera
+        SEARCH_LOG_COMPACT_LINES se fusiona todo en el índice principal.
+        
+        Args:
+            batch_lines (int): Líneas nuevas acumuladas en memoria antes de
+                escribir el índice principal (acota la memoria al reconstruir)
+        """
+        if not notes_exist(self.file_path):
+            return
+        # Dos búsquedas simultáneas no deben añadir las mismas líneas al log
+        lock = FileLock(self.index_path + LOCK_SUFFIX)
+        try:
+            with lock:
+                self._update(batch_lines)
+        finally:
+            lock.close()
+    
+    def _update(self, batch_lines):
+        """Cuerpo de update(), ejecutado con el lock del índice tomado."""
+        header = self._read_header()
+        signature = notes_signature(self.file_path)
+        size = signature[0]
+        if header is not None and header[3:] == signature:
+            # Las notas no cambiaron desde la última actualización
+            return
+        if header is None and os.path.exists(self.index_path):
+            # Índice de otra versión: el log no tiene con qué combinarse
+            self.clear()
+        covered_size, covered_lines = self.coverage()
+        # Mismo tamaño con otro mtime: una edición a mano que no cambia la
+        # longitud (las rotaciones propias ya actualizan la firma en rotate())
+        edited = header is not None and header[3] == size
+        if edited or covered_size > size or not self._is_consistent(covered_size, covered_lines):
+            self.clear()
+            covered_size, covered_lines = 0, 0
+        if covered_size == size:
+            self._save_signature(signature)
+            return
+        
+        log_lines = covered_lines - self._main_coverage()[1]
+        pending = []      # Líneas nuevas para el log: (número, offset final, términos)
+        postings = None   # término → líneas, cuando toca fusionar con el índice principal
+        merged_lines = 0
+        
+        with open_notes(self.file_path) as f:
+            f.seek(covered_size)
+            pos = covered_size
+            line_no = covered_lines
+            remainder = b''
+            while True:
+                block = f.read(READ_CHUNK_SIZE * 16)
+                if not block:
+                    break
+                parts = (remainder + block).split(b'\n')
+                # La última línea sin salto de línea se indexará cuando se complete
+                remainder = parts.pop()
+                for part in parts:
+                    line_no += 1
+                    pos += len(part) + 1
+                    terms = tokenize(part.decode('utf-8', errors='replace'))
+                    if postings is None:
+                        pending.append((line_no, pos, terms))
+                        if log_lines + len(pending) >= SEARCH_LOG_COMPACT_LINES:
+                            postings = self._load_postings()
+                            for pending_line, _, pending_terms in pending:
+                                _add_postings(postings, pending_terms, pending_line)
+                            pending = []
+                    else:
+                        _add_postings(postings, terms, line_no)
+                        merged_lines += 1
+                
+                if postings is not None and merged_lines >= batch_lines:
+                    # Volcar a disco y liberar memoria antes de seguir
+                    self._write_main(postings, pos, line_no, signature)
+                    postings = None
+                    merged_lines = 0
+                    log_lines = 0
+        
+        if postings is not None:
+            self._write_main(postings, pos, line_no, signature)
+            return
+        if pending:
+            records = ''.join(
+                f"{number}\t{end}\t{' '.join(sorted(terms))}\n"
+                for number, end, terms in pending
+            )
+            # Una sola escritura: si el proceso termina a mitad, no queda un registro cortado
+            with open(self.log_path, 'ab', buffering=0) as log:
+                log.write(records.encode('utf-8'))
+        self._save_signature(signature)
+    
+    def _load_log(self):
+        """
+        Returns:
+            dict: término → lista de números de línea presentes en el log
+        """
+        postings = {}
+        if not os.path.exists(self.log_path):
+            return postings
+        with open(self.log_path, 'r', encoding='utf-8') as log:
+            for record in log:
+                line_no, _, terms = record.rstrip('\n').split('\t', 2)
+                for term in terms.split():
+                    postings.setdefault(term, []).append(int(line_no))
+        return postings
+    
+    def _load_postings(self):
+        """
+        Carga en memoria el índice principal más el log.
+        
+        Returns:
+            dict: término → array de números de línea
+        """
+        postings = {}
+        _, _, terms = self._main_coverage()
+        if terms:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            for i in range(terms):
+                entry_pos = SEARCH_INDEX_HEADER.size + i * SEARCH_VOCAB_ENTRY.size
+                term_off, term_len, count, post_off = SEARCH_VOCAB_ENTRY.unpack_from(data, entry_pos)
+                line_ids = array('I')
+                line_ids.frombytes(data[post_off:post_off + count * 4])
+                postings[data[term_off:term_off + term_len].decode('utf-8')] = line_ids
+            del data
+        
+        for term, line_ids in self._load_log().items():
+            postings.setdefault(term, array('I')).extend(line_ids)
+        return postings
+    
+    def _write_main(self, postings, covered_size, covered_lines, signature):
+        """Escribe el índice principal ordenado por término y descarta el log."""
+        terms = sorted(postings)
+        encoded = [term.encode('utf-8') for term in terms]
+        vocab_start = SEARCH_INDEX_HEADER.size
+        terms_start = vocab_start + len(terms) * SEARCH_VOCAB_ENTRY.size
+        postings_start = terms_start + sum(len(t) for t in encoded)
+        
+        entries = []
+        all_ids = array('I')
+        term_off = terms_start
+        for term, raw in zip(terms, encoded):
+            line_ids = postings[term]
+            entries.append(SEARCH_VOCAB_ENTRY.pack(
+                term_off, len(raw), len(line_ids), postings_start + len(all_ids) * 4
+            ))
+            term_off += len(raw)
+            all_ids.extend(line_ids)
+        
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(SEARCH_INDEX_HEADER.pack(
+                SEARCH_INDEX_MAGIC, covered_size, covered_lines, len(terms), *signature
+            ))
+            f.write(b''.join(entries))
+            f.write(b''.join(encoded))
+            all_ids.tofile(f)
+        os.replace(tmp_path, self.index_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+    
+    def _lookup_main(self, term):
+        """
+        Busca un término en el índice principal con búsqueda binaria.
+        
+        Returns:
+            array: Números de línea que contienen el término
+        """
+        line_ids = array('I')
+        _, _, terms = self._main_coverage()
+        if not terms:
+            return line_ids
+        target = term.encode('utf-8')
+        with open(self.index_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                lo, hi = 0, terms
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    entry_pos = SEARCH_INDEX_HEADER.size + mid * SEARCH_VOCAB_ENTRY.size
+                    term_off, term_len, count, post_off = SEARCH_VOCAB_ENTRY.unpack_from(mm, entry_pos)
+                    current = mm[term_off:term_off + term_len]
+                    if current == target:
+                        line_ids.frombytes(mm[post_off:post_off + count * 4])
+                        break
+                    # El orden de bytes UTF-8 coincide con el orden de str
+                    if current < target:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+        return line_ids
+    
+    def search(self, query):
+        """
+        Busca las líneas que contienen todos los términos de la consulta.
+        
+        Args:
+            query (str): Términos separados por espacios
+            
+        Returns:
+            list: Números de línea (1-indexed) en orden ascendente
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self.update()
+        log_postings = self._load_log()
+        
+        # Las líneas del log siempre son posteriores a las del índice principal,
+        # así que cada lista resultante ya está ordenada
+        postings = []
+        for term in terms:
+            line_ids = self._lookup_main(term)
+            line_ids.extend(log_postings.get(term, ()))
+            if not line_ids:
+                return []
+            postings.append(line_ids)
+        
+        # Intersección empezando por el término menos frecuente
+        postings.sort(key=len)
+        result = list(postings[0])
+        for line_ids in postings[1:]:
+            result = [n for n in result if _sorted_contains(line_ids, n)]
+            if not result:
+                break
+        return result
+
+
+def _sorted_contains(values, value):
+    """Búsqueda binaria de un valor en una secuencia ordenada."""
+    pos = bisect.bisect_left(values, value)
+    return pos < len(values) and values[pos] == value
+
+
+def _add_postings(postings, terms, line_no):
+    """Añade un número de línea a la lista de cada término."""
+    for term in terms:
+        line_ids = postings.get(term)
+        if line_ids is None:
+            postings[term] = line_ids = array('I')
+        line_ids.append(line_no)
+
+
+def run_search(file_path, query, return_to_recording=False):
+    """
+    Busca en las notas y permite abrir un resultado en el modo lectura.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        query (str): Términos a buscar (si está vacío, se piden al usuario)
+        return_to_recording (bool): Si True, se invocó desde una sesión de escritura
+    """
+    store = get_note_store(file_path)
+    if not store.exists():
+        print("No hay notas guardadas aún. Usa 'notez' para empezar a escribir.")
+        return
+    
+    try:
+        if not query.strip():
+            query = input("Buscar: ")
+        matches = store.search(query)
+    except (KeyboardInterrupt, EOFError):
+        return
+    except Exception as e:
+        print(f"Error al buscar: {e}")
+        return
+    
+    recent = [
+        (line_number, next(store.iter_lines(line_number, line_number), ""))
+        for line_number in matches[-SEARCH_MAX_RESULTS:]
+    ]
+    show_search_results(file_path, f"'{query.strip()}'", matches, recent, return_to_recording)
+
+
+def show_search_results(file_path, title, matches, recent, return_to_recording=False):
+    """
+    Muestra los resultados de una búsqueda y permite abrir uno en el modo lectura.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        title (str): Descripción de la búsqueda para la cabecera
+        matches (list): Números de línea de todas las coincidencias (ascendentes)
+        recent (list): (número de línea, texto) de las coincidencias a mostrar
+        return_to_recording (bool): Si True, se invocó desde una sesión de escritura
+    """
+    print(f"\n╭── noteZ SEARCH ── {title} ── {len(matches)} resultados ──╮")
+    if not matches:
+        print("│ (Sin coincidencias)")
+        return
+    
+    for line_number, line in recent:
+        print(f"{line_number:4d} │ {line}")
+    if len(recent) < len(matches):
+        print(f"(Mostrando los {len(recent)} resultados más recientes)")
+    
+    if not sys.stdin.isatty():
+        return
+    try:
+        choice = input("\nLínea a abrir en modo lectura (Enter para volver): ").strip()
+    except (KeyboardInterrupt, EOFError):
+        return
+    if choice.isdigit() and int(choice) in matches:
+        read_notes(file_path, return_to_recording, focus_line=int(choice))
+
+
+class TailBuffer:
+    """
+    Buffer circular con las últimas líneas del archivo de notas.
+    
+    Lo usa el modo dual para no releer el archivo tras cada nota: las notas
+    escritas en la sesión se añaden directamente al buffer y solo se vuelve
+    a leer el final del archivo si cambia el tamaño del panel o si el archivo
+    fue modificado por fuera.
+    """
+    
+    def __init__(self, file_path, capacity=0):
+        """
+        Args:
+            file_path (str): Ruta completa al archivo de notas
+            capacity (int): Número máximo de líneas a conservar
+        """
+        self.file_path = file_path
+        self.store = get_note_store(file_path)
+        self.lines = deque(maxlen=capacity)
+        self.total_lines = 0
+        self.known_size = None
+        self.error = False
+    
+    def reload(self):
+        """Relee las últimas líneas del archivo (lectura desde el final)."""
+        self.lines.clear()
+        self.total_lines = 0
+        self.known_size = None
+        self.error = False
+        
+        try:
+            if not self.store.exists():
+                return
+            size = self.store.size()
+            self.total_lines = self.store.line_count()
+            newest_first = []
+            for line in self.store.iter_lines_reverse(self.total_lines):
+                if len(newest_first) >= self.lines.maxlen:
+                    break
+                newest_first.append(line)
+            self.lines.extend(reversed(newest_first))
+            self.known_size = size
+        except Exception:
+            self.error = True
+    
+    def sync(self, capacity):
+        """
+        Asegura que el buffer refleja el final del archivo.
+        
+        Args:
+            capacity (int): Líneas que caben actualmente en el panel
+        """
+        if capacity != self.lines.maxlen:
+            self.lines = deque(maxlen=capacity)
+            self.reload()
+            return
+        try:
+            size = self.store.size()
+        except Exception:
+            size = None
+        if size != self.known_size or self.error:
+            self.catch_up()
+    
+    def catch_up(self):
+        """
+        Añade al buffer solo las líneas completas escritas desde la última
+        lectura (por otra sesión, un pipe...). Si el archivo se acortó o
+        creció demasiado, relee el final como reload().
+        
+        Returns:
+            bool: True si el contenido del buffer cambió
+        """
+        if self.known_size is None or self.error:
+            self.reload()
+            return self.known_size is not None or self.error
+        try:
+            result = self.store.read_since(self.known_size, TAIL_CATCH_UP_MAX_BYTES)
+        except Exception:
+            self.error = True
+            return True
+        if result is None:
+            self.reload()
+            return True
+        lines, position = result
+        self.known_size = position
+        if not lines:
+            return False
+        self.lines.extend(lines)
+        self.total_lines += len(lines)
+        return True
+    
+    def record_append(self, text, start, end):
+        """
+        Añade al buffer un bloque recién escrito por esta sesión.
+        
+        Args:
+            text (str): Texto escrito (una o más líneas terminadas en salto de línea)
+            start (int): Offset donde se escribió el bloque
+            end (int): Offset final tras la escritura
+        """
+        if self.known_size == end:
+            # El vigilante ya leyó este bloque del archivo
+            return
+        if self.known_size != start:
+            # El archivo cambió por fuera desde la última lectura
+            self.known_size = None
+            return
+        for line in text.split('\n')[:-1]:
+            self.lines.append(line)
+            self.total_lines += 1
+        self.known_size = end
+
+
+# ============================================================================
+# BÚSQUEDA POR EXPRESIÓN REGULAR (--grep, en paralelo)
+# ============================================================================
+# Para patrones que el índice invertido no puede responder se recorren las
+# notas completas: cada segmento se divide en bloques de bytes que se buscan
+# en paralelo (un proceso por núcleo) sobre vistas mmap del archivo. Los
+# segmentos comprimidos se buscan enteros, uno por proceso.
+GREP_CHUNK_BYTES = 8 * 1024 * 1024
+# Por debajo de este tamaño total no compensa arrancar procesos
+GREP_PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+
+def _line_start_at(buf, pos, limit):
+    """
+    Ajusta un límite de bloque al inicio de la línea siguiente.
+    
+    Dos bloques vecinos ajustan su límite común al mismo offset, así que
+    cada línea pertenece exactamente al bloque donde empieza.
+    
+    Args:
+        buf: Contenido del segmento (bytes o mmap)
+        pos (int): Límite sin ajustar
+        limit (int): Tamaño del segmento a considerar
+        
+    Returns:
+        int: Offset del primer inicio de línea >= pos (o limit)
+    """
+    if pos <= 0 or pos >= limit:
+        return min(max(pos, 0), limit)
+    newline = buf.find(b'\n', pos - 1, limit)
+    return limit if newline < 0 else newline + 1
+
+
+def _grep_buffer(regex, buf, begin, end):
+    """
+    Busca el patrón línea a línea dentro de buf[begin:end].
+    
+    El bloque empieza y termina en inicio de línea, así que se decodifica
+    entero sin cortar caracteres y el patrón se aplica al texto de cada
+    línea (`.`, las clases y `(?i)` trabajan sobre caracteres, no bytes).
+    
+    Returns:
+        tuple: (líneas del bloque, [(línea relativa desde 0, texto)])
+    """
+    lines = buf[begin:end].decode('utf-8', errors='replace').split('\n')
+    # Tras el último salto de línea queda un elemento vacío que no es una línea;
+    # una última línea sin salto de línea sí cuenta (como en LineIndex)
+    if not lines[-1]:
+        lines.pop()
+    matches = []
+    for line_no, line in enumerate(lines):
+        line = line.rstrip('\r')
+        if regex.search(line):
+            matches.append((line_no, line))
+    return len(lines), matches
+
+
+def _grep_chunk(task):
+    """
+    Busca en un bloque de un segmento (se ejecuta en un proceso del pool).
+    
+    Args:
+        task (tuple): (ruta del segmento, inicio, fin, tamaño del segmento, patrón)
+        
+    Returns:
+        tuple: (líneas del bloque, [(línea relativa desde 0, texto)])
+    """
+    path, begin, end, limit, pattern = task
+    regex = re.compile(pattern)
+    if path.endswith('.nzz'):
+        with CompressedSegment(path) as segment:
+            data = segment.read(segment.size)
+        return _grep_buffer(regex, data, 0, len(data))
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            limit = min(limit, len(mm))
+            begin = _line_start_at(mm, begin, limit)
+            end = _line_start_at(mm, end, limit)
+            return _grep_buffer(regex, mm, begin, end)
+
+
+def grep_notes(file_path, pattern, workers=None):
+    """
+    Busca una expresión regular en todas las notas, en paralelo si son grandes.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        pattern (str): Expresión regular (se aplica al texto de cada línea)
+        workers (int): Procesos a usar (default: uno por núcleo)
+        
+    Yields:
+        tuple: (número de línea, texto) de cada coincidencia, en orden de archivo
+        
+    Raises:
+        re.error: Si el patrón no es válido
+    """
+    re.compile(pattern)
+    
+    tasks = []
+    with open_notes(file_path) as notes:
+        parts = [(path, size) for _, size, path in notes.parts if size]
+    for path, size in parts:
+        if path.endswith('.nzz'):
+            tasks.append((path, 0, size, size, pattern))
+            continue
+        for begin in range(0, size, GREP_CHUNK_BYTES):
+            tasks.append((path, begin, min(begin + GREP_CHUNK_BYTES, size), size, pattern))
+    
+    total_bytes = sum(size for _, size in parts)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2 or total_bytes < GREP_PARALLEL_MIN_BYTES:
+        yield from _merge_grep_results(map(_grep_chunk, tasks))
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        yield from _merge_grep_results(pool.map(_grep_chunk, tasks))
+
+
+def _merge_grep_results(results):
+    """Convierte los resultados por bloque (en orden) en números de línea absolutos."""
+    first_line = 1
+    for line_count, matches in results:
+        for relative_line, text in matches:
+            yield first_line + relative_line, text
+        first_line += line_count
+
+
+def run_grep(file_path, pattern, return_to_recording=False):
+    """
+    Busca una expresión regular en las notas y permite abrir un resultado.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        pattern (str): Expresión regular
+        return_to_recording (bool): Si True, se invocó desde una sesión de escritura
+    """
+    store = get_note_store(file_path)
+    if not store.exists():
+        print("No hay notas guardadas aún. Usa 'notez' para empezar a escribir.")
+        return
+    
+    matches = array('Q')
+    recent = deque(maxlen=SEARCH_MAX_RESULTS)
+    try:
+        for line_number, text in store.grep(pattern):
+            matches.append(line_number)
+            recent.append((line_number, text))
+    except re.error as e:
+        print(f"Expresión regular no válida: {e}")
+        return
+    except KeyboardInterrupt:
+        return
+    except Exception as e:
+        print(f"Error al buscar: {e}")
+        return
+    show_search_results(file_path, f"/{pattern}/", matches, list(recent), return_to_recording)
+
+
+# ============================================================================
+# VIGILANCIA DE CAMBIOS EXTERNOS (panel en tiempo real del modo dual)
+# ============================================================================
+# En Linux/Android se usa inotify (vía ctypes) sobre el directorio de notas;
+# en el resto, o si inotify no está disponible, se comprueba tamaño y mtime
+# cada WATCH_POLL_INTERVAL segundos.
+WATCH_POLL_INTERVAL = 0.5
+# Bytes nuevos que se leen incrementalmente; si hay más, se relee el final
+TAIL_CATCH_UP_MAX_BYTES = 1024 * 1024
+
+# Eventos de inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class NotesWatcher:
+    """
+    Hilo en segundo plano que avisa cuando cambian los archivos de notas.
+    
+    El aviso (`on_change`) se ejecuta en el hilo del vigilante, así que debe
+    sincronizarse con el hilo principal por su cuenta.
+    """
+    
+    def __init__(self, paths, on_change, interval=WATCH_POLL_INTERVAL):
+        """
+        Args:
+            paths (list): Archivos a vigilar (pueden no existir todavía)
+            on_change (callable): Función sin argumentos llamada tras cada cambio
+            interval (float): Segundos entre comprobaciones (y espera máxima de inotify)
+        """
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Arranca el hilo vigilante (daemon: no retrasa la salida del programa)."""
+        self._thread = threading.Thread(target=self._run, name='notez-watcher', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Detiene el hilo vigilante y espera a que termine."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+    
+    def _notify(self):
+        """Ejecuta el aviso sin dejar que un error detenga el vigilante."""
+        try:
+            self.on_change()
+        except Exception:
+            pass
+    
+    def _run(self):
+        fd = self._open_inotify()
+        if fd is None:
+            self._run_polling()
+            return
+        try:
+            self._run_inotify(fd)
+        finally:
+            os.close(fd)
+    
+    def _open_inotify(self):
+        """
+        Returns:
+            int: Descriptor de inotify vigilando los directorios, o None si no hay inotify
+        """
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+                os.close(fd)
+                return None
+        return fd
+    
+    def _run_inotify(self, fd):
+        import select
+        names = {os.fsencode(os.path.basename(path)) for path in self.paths}
+        while not self._stop.is_set():
+            ready, _, _ = select.select([fd], [], [], self.interval)
+            if not ready:
+                continue
+            changed = False
+            while True:
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    break
+                pos = 0
+                while pos + INOTIFY_EVENT.size <= len(data):
+                    _, _, _, name_len = INOTIFY_EVENT.unpack_from(data, pos)
+                    start = pos + INOTIFY_EVENT.size
+                    name = data[start:start + name_len].rstrip(b'\0')
+                    changed = changed or name in names
+                    pos = start + name_len
+            # Una ráfaga de eventos produce un solo aviso
+            if changed:
+                self._notify()
+    
+    def _run_polling(self):
+        def signature():
+            result = []
+            for path in self.paths:
+                try:
+                    st = os.stat(path)
+                    result.append((st.st_ino, st.st_size, st.st_mtime_ns))
+                except OSError:
+                    result.append(None)
+            return result
+        
+        last = signature()
+        while not self._stop.wait(self.interval):
+            current = signature()
+            if current != last:
+                last = current
+                self._notify()
+
+
+def render_dual_read_panel(tail, read_lines, term_width):
+    """
+    Renderiza el panel de lectura para el modo dual.
+    
+    Args:
+        tail (TailBuffer): Buffer con las últimas líneas del archivo de notas
+        read_lines (int): Número de líneas disponibles para el panel de lectura
+        term_width (int): Ancho del terminal
+    
+    Returns:
+        list: Lista de líneas formateadas para mostrar
+    """
+    display_lines = []
+    
+    # Línea de encabezado
+    header = "╭── noteZ DUAL MODE ── Panel de Lectura (tiempo real) ──╮"
+    display_lines.append(header[:term_width])
+    
+    # Líneas disponibles para contenido (descontar header y separador)
+    content_lines = read_lines - 2
+    
+    if tail.error:
+        display_lines.append("│ (Error al leer archivo)")
+        for _ in range(content_lines - 1):
+            display_lines.append("│")
+    elif tail.known_size is None:
+        display_lines.append("│ (No hay notas guardadas aún)")
+        # Rellenar con líneas vacías
+        for _ in range(content_lines - 1):
+            display_lines.append("│")
+    elif not tail.total_lines:
+        display_lines.append("│ (El archivo está vacío)")
+        for _ in range(content_lines - 1):
+            display_lines.append("│")
+    else:
+        # Mostrar las últimas N líneas que quepan
+        visible = list(tail.lines)[-content_lines:] if content_lines > 0 else []
+        first_number = tail.total_lines - len(visible) + 1
+        max_content_width = term_width - 7  # "1234 │ "
+        
+        for i, line_content in enumerate(visible, start=first_number):
+            line_content = line_content.rstrip()
+            # Truncar si es muy larga
+            if len(line_content) > max_content_width:
+                line_content = line_content[:max_content_width - 3] + "..."
+            formatted_line = f"{i:4d} │ {line_content}"
+            display_lines.append(formatted_line[:term_width])
+        
+        # Rellenar con líneas vacías si no hay suficientes notas
+        for _ in range(content_lines - len(visible)):
+            display_lines.append("│")
+    
+    # Línea separadora
+    separator = "╰" + "─" * (term_width - 2) + "╯"
+    display_lines.append(separator[:term_width])
+    
+    return display_lines
+
+
+async def run_dual_mode(file_path, session):
+    """
+    Ejecuta el modo dual con panel de lectura arriba y grabación abajo.
+    El panel superior muestra las notas en tiempo real (80% del espacio).
+    El panel inferior permite escribir nuevas notas (20% del espacio).
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        session (InteractiveSession): Bucle de eventos de la sesión
+        
+    Returns:
+        str: Próximo estado ('quit', 'normal', 'hide')
+    """
+    # Últimas líneas del archivo, actualizadas con cada nota de la sesión
+    tail = TailBuffer(file_path)
+    renderer = ScreenRenderer()
+    writer = get_note_writer(file_path)
+    
+    def on_notes_changed():
+        """Notas escritas por otra sesión o un pipe: actualizar solo el panel."""
+        if renderer.previous is None or not tail.catch_up():
+            return
+        renderer.render_rows(build_dual_frame(tail)[0])
+    
+    def on_resize():
+        """El tamaño de los paneles depende del terminal: frame nuevo y prompt."""
+        if renderer.previous is None:
+            return
+        renderer.invalidate()
+        renderer.render(build_dual_frame(tail)[0])
+        session.redraw_prompt()
+    
+    # Cada bloque escrito por el writer se añade al buffer del panel; el
+    # vigilante avisa desde su hilo y el panel se actualiza en el del bucle
+    watcher = NotesWatcher(writer.store.watch_paths(), session.call_threadsafe(on_notes_changed))
+    writer.listeners.append(tail.record_append)
+    session.on_resize = on_resize
+    watcher.start()
+    try:
+        return await _dual_mode_loop(file_path, session, writer, tail, renderer)
+    finally:
+        session.on_resize = None
+        watcher.stop()
+        writer.listeners.remove(tail.record_append)
+
+
+def build_dual_frame(tail):
+    """
+    Construye el frame completo del modo dual con el tamaño actual del terminal.
+    
+    Args:
+        tail (TailBuffer): Buffer con las últimas líneas para el panel de lectura
+        
+    Returns:
+        tuple: (filas del frame, ancho, alto, líneas del panel de lectura)
+    """
+    term_width, term_height = get_terminal_size()
+    
+    # Calcular líneas para el panel de lectura
+    read_panel_lines = max(5, int(term_height * DUAL_READ_PANEL_RATIO))
+    
+    # Releer el final del archivo solo si cambió el tamaño o hubo cambios externos
+    tail.sync(read_panel_lines - 2)
+    
+    # Renderizar panel de lectura
+    frame = render_dual_read_panel(tail, read_panel_lines, term_width)
+    
+    # Línea de información del panel de escritura
+    write_header = f"╭── Panel de Escritura ── /h ayuda ── /q salir ──╮"
+    frame.append(write_header[:term_width])
+    return frame, term_width, term_height, read_panel_lines
+
+
+async def _dual_mode_loop(file_path, session, writer, tail, renderer):
+    """
+    Bucle principal del modo dual (ver run_dual_mode).
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        session (InteractiveSession): Bucle de eventos de la sesión
+        writer (NoteWriter): Writer compartido de la sesión
+        tail (TailBuffer): Buffer con las últimas líneas para el panel de lectura
+        renderer (ScreenRenderer): Renderizador por diferencias
+        
+    Returns:
+        str: Próximo estado ('quit', 'normal', 'hide')
+    """
+    def refresh_display():
+        """Refresca la pantalla completa del modo dual."""
+        frame, term_width, term_height, read_panel_lines = build_dual_frame(tail)
+        # Solo se reescriben las filas que cambiaron respecto al frame anterior
+        renderer.render(frame)
         return term_width, term_height, read_panel_lines
     
+    def leave_frame():
+        """Marca el frame como retirado (ayuda, búsqueda, salir) para que el vigilante no pinte encima."""
+        renderer.invalidate()
+    
     # Mostrar pantalla inicial
     term_width, term_height, read_panel_lines = refresh_display()
     
-    # Bucle principal de escritura
+    # Bucle principal de escritura
+    while True:
+        try:
+            lines = await session.read_input("[noteZ DUAL] > ", renderer.read_input)
+            if len(lines) > 1:
+                # Texto pegado: una sola escritura y un solo refresco al final
+                try:
+                    writer.write_batch(lines)
+                except Exception as e:
+                    print(f"Error al guardar: {e}")
+                # El eco del texto pegado desplaza la pantalla: repintado completo
+                renderer.invalidate()
+                term_width, term_height, read_panel_lines = refresh_display()
+                continue
+            user_input = lines[0]
+            
+            # Manejar comandos especiales
+            if user_input == '/q':
+                # Escribir línea decorativa final y salir
+                try:
+                    writer.write_session_end()
+                except Exception as e:
+                    print(f"Error al guardar: {e}")
+                leave_frame()
+                clear_screen()
+                print("\n¡Notas guardadas! Hasta luego.")
+                return 'quit'
+                
+            elif user_input == '/h':
+                # Mostrar ayuda
+                leave_frame()
+                clear_screen()
+                show_help()
+                term_width, term_height, read_panel_lines = refresh_display()
+                continue
+                
+            elif user_input == '/stats':
+                # Latencias de la sesión (con --stats)
+                leave_frame()
+                clear_screen()
+                show_stats(wait=True)
+                term_width, term_height, read_panel_lines = refresh_display()
+                continue
+                
+            elif user_input == '/n':
+                # Línea vacía como separador mínimo
+                try:
+                    writer.write_blank()
+                except Exception as e:
+                    print(f"Error al guardar: {e}")
+                # Refrescar display para mostrar cambio
+                term_width, term_height, read_panel_lines = refresh_display()
+                continue
+                
+            elif user_input == '/n=':
+                # Línea decorativa con separador
+                try:
+                    writer.write_separator()
+                except Exception as e:
+                    print(f"Error al guardar: {e}")
+                # Refrescar display para mostrar cambio
+                term_width, term_height, read_panel_lines = refresh_display()
+                continue
+                
+            elif is_search_command(user_input):
+                # Buscar en las notas; al volver se repinta el modo dual
+                leave_frame()
+                clear_screen()
+                run_search(file_path, user_input[2:], return_to_recording=True)
+                term_width, term_height, read_panel_lines = refresh_display()
+                continue
+                
+            elif user_input == '/r':
+                # En modo dual, /r no hace nada especial (ya estamos viendo las notas)
+                print("(Ya estás en modo dual - las notas se muestran arriba en tiempo real)")
+                renderer.invalidate()
+                continue
+
+            elif user_input == '/normal':
+                leave_frame()
+                clear_screen()
+                return 'normal'
+            
+            elif user_input == '/hide':
+                return 'hide'
+
+            elif user_input == '/dual':
+                print("(Ya estás en modo dual)")
+                renderer.invalidate()
+                continue
+                
+            else:
+                # Línea normal de nota con timestamp
+                if user_input.strip():  # Solo escribir si no está vacía
+                    try:
+                        writer.write_note(user_input)
+                    except Exception as e:
+                        print(f"Error al guardar: {e}")
+                        renderer.invalidate()
+                    # Refrescar display para mostrar nueva nota
+                    term_width, term_height, read_panel_lines = refresh_display()
+                
+        except KeyboardInterrupt:
+            # Ctrl+C: guardar línea de cierre y salir limpiamente
+            print("\n\nGuardando y cerrando...")
+            try:
+                writer.write_interrupt()
+                leave_frame()
+                clear_screen()
+                print("¡Notas guardadas! Hasta luego.")
+            except Exception as e:
+                print(f"Error al guardar: {e}")
+            return 'quit'
+        except EOFError:
+            # EOF (Ctrl+D en Unix): salir limpiamente
+            leave_frame()
+            clear_screen()
+            print("\n\n¡Hasta luego!")
+            return 'quit'
+
+
+async def run_hide_mode(file_path, session):
+    """
+    Ejecuta el modo hide (privacidad ampliada).
+    Limpia la pantalla tras cada nota guardada para proteger la información.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        session (InteractiveSession): Bucle de eventos de la sesión
+        
+    Returns:
+        str: Próximo estado ('quit', 'normal', 'dual')
+    """
+    writer = get_note_writer(file_path)
+    # El scrollback se limpia en cada frame para que la nota escrita no quede expuesta
+    renderer = ScreenRenderer(clear_scrollback=True)
+    
+    def show_frame(message=None):
+        """Repinta el header compacto y un mensaje de estado opcional."""
+        frame = hide_header_lines(compact=True)
+        if message:
+            frame += ["", message]
+        frame.append("")
+        renderer.render(frame)
+    
+    def on_resize():
+        """Repinta el último frame completo y el prompt tras redimensionar."""
+        rows = renderer.previous
+        if rows is None:
+            return
+        renderer.invalidate()
+        renderer.render(rows)
+        session.redraw_prompt()
+    
+    # Limpiar pantalla al iniciar modo hide
+    renderer.render(hide_header_lines() + ["", f"Archivo: {file_path}", ""])
+    session.on_resize = on_resize
+    try:
+        return await _hide_mode_loop(file_path, session, writer, renderer, show_frame)
+    finally:
+        session.on_resize = None
+
+
+async def _hide_mode_loop(file_path, session, writer, renderer, show_frame):
+    """
+    Bucle principal del modo hide (ver run_hide_mode).
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        session (InteractiveSession): Bucle de eventos de la sesión
+        writer (NoteWriter): Writer compartido de la sesión
+        renderer (ScreenRenderer): Renderizador (limpia el scrollback en cada frame)
+        show_frame (callable): Repinta el header compacto con un mensaje opcional
+        
+    Returns:
+        str: Próximo estado ('quit', 'normal', 'dual')
+    """
     while True:
         try:
-            user_input = input("[noteZ DUAL] > ")
+            lines = await session.read_input("[noteZ HIDE] > ", renderer.read_input)
+            if len(lines) > 1:
+                # Texto pegado: una sola escritura y un solo repintado al final
+                try:
+                    saved = writer.write_batch(lines)
+                    message = f"✓ {saved} notas guardadas"
+                except Exception as e:
+                    message = f"Error al guardar: {e}"
+                renderer.invalidate()
+                show_frame(message)
+                continue
+            user_input = lines[0]
             
             # Manejar comandos especiales
             if user_input == '/q':
                 # Escribir línea decorativa final y salir
-                timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
                 try:
-                    with open(file_path, 'a', encoding='utf-8') as f:
-                        f.write(f"{timestamp} ============================ Sesión finalizada ===========================\n")
+                    writer.write_session_end()
                 except Exception as e:
                     print(f"Error al guardar: {e}")
-                clear_screen()
+                    clear_screen()
                 print("\n¡Notas guardadas! Hasta luego.")
                 return 'quit'
                 
@@ -437,71 +4313,90 @@ def run_dual_mode(file_path):
                 # Mostrar ayuda
                 clear_screen()
                 show_help()
-                term_width, term_height, read_panel_lines = refresh_display()
+                # Limpiar pantalla tras ver ayuda y mostrar header compacto
+                renderer.invalidate()
+                show_frame()
+                continue
+                
+            elif user_input == '/stats':
+                # Latencias de la sesión; se limpian al volver, como la ayuda
+                clear_screen()
+                show_stats(wait=True)
+                renderer.invalidate()
+                show_frame()
                 continue
                 
             elif user_input == '/n':
                 # Línea vacía como separador mínimo
                 try:
-                    with open(file_path, 'a', encoding='utf-8') as f:
-                        f.write("\n")
+                    writer.write_blank()
+                    message = "✓ Separador guardado"
                 except Exception as e:
-                    print(f"Error al guardar: {e}")
-                # Refrescar display para mostrar cambio
-                term_width, term_height, read_panel_lines = refresh_display()
+                    message = f"Error al guardar: {e}"
+                # Limpiar pantalla tras guardar
+                show_frame(message)
                 continue
                 
             elif user_input == '/n=':
                 # Línea decorativa con separador
-                timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
                 try:
-                    with open(file_path, 'a', encoding='utf-8') as f:
-                        f.write(f"{timestamp} ==========================================================================\n")
+                    writer.write_separator()
+                    message = "✓ Separador decorativo guardado"
                 except Exception as e:
-                    print(f"Error al guardar: {e}")
-                # Refrescar display para mostrar cambio
-                term_width, term_height, read_panel_lines = refresh_display()
+                    message = f"Error al guardar: {e}"
+                # Limpiar pantalla tras guardar
+                show_frame(message)
                 continue
                 
             elif user_input == '/r':
-                # En modo dual, /r no hace nada especial (ya estamos viendo las notas)
-                print("(Ya estás en modo dual - las notas se muestran arriba en tiempo real)")
+                # Modo lectura temporal
+                read_notes(file_path, return_to_recording=True)
+                # Limpiar pantalla tras volver de lectura
+                renderer.invalidate()
+                show_frame()
+                continue
+                
+            elif is_search_command(user_input):
+                # Búsqueda temporal; los resultados se limpian al volver
+                run_search(file_path, user_input[2:], return_to_recording=True)
+                renderer.invalidate()
+                show_frame()
+                continue
+                
+            elif user_input == '/hide':
+                # Ya estamos en modo hide
+                show_frame("(Ya estás en modo privacidad)")
                 continue
 
             elif user_input == '/normal':
                 clear_screen()
                 return 'normal'
-            
-            elif user_input == '/hide':
-                return 'hide'
 
             elif user_input == '/dual':
-                print("(Ya estás en modo dual)")
-                continue
+                return 'dual'
                 
             else:
                 # Línea normal de nota con timestamp
                 if user_input.strip():  # Solo escribir si no está vacía
-                    timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
                     try:
-                        with open(file_path, 'a', encoding='utf-8') as f:
-                            f.write(f"{timestamp} {user_input}\n")
+                        writer.write_note(user_input)
+                        message = "✓ Nota guardada"
                     except Exception as e:
-                        print(f"Error al guardar: {e}")
-                    # Refrescar display para mostrar nueva nota
-                    term_width, term_height, read_panel_lines = refresh_display()
+                        message = f"Error al guardar: {e}"
+                    
+                    # Limpiar pantalla tras guardar - PRIVACIDAD
+                    show_frame(message)
                 
         except KeyboardInterrupt:
             # Ctrl+C: guardar línea de cierre y salir limpiamente
             print("\n\nGuardando y cerrando...")
-            timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
             try:
-                with open(file_path, 'a', encoding='utf-8') as f:
-                    f.write(f"{timestamp} ========== Interrupción del usuario ==========\n")
+                writer.write_interrupt()
                 clear_screen()
                 print("¡Notas guardadas! Hasta luego.")
             except Exception as e:
                 print(f"Error al guardar: {e}")
+                clear_screen()
             return 'quit'
         except EOFError:
             # EOF (Ctrl+D en Unix): salir limpiamente
@@ -510,212 +4405,804 @@ def run_dual_mode(file_path):
             return 'quit'
 
 
-def run_hide_mode(file_path):
+async def run_recording_mode(file_path, session):
+    """
+    Ejecuta el modo normal de grabación.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        session (InteractiveSession): Bucle de eventos de la sesión
+        
+    Returns:
+        str: Próximo estado ('quit', 'hide', 'dual')
+    """
+    writer = get_note_writer(file_path)
+    clear_screen()
+    print("╭─────────────────────────────────────────╮")
+    print("│     noteZ - Notas Rápidas Continuas     │")
+    print("│                                         │")
+    print("│  Escribe tus notas y presiona Enter     │")
+    print("│  Comandos: /n /n= /r /h /hide /dual /q  │")
+    print("│  Ctrl+C para salir seguro              │")
+    print("╰─────────────────────────────────────────╯")
+    print(f"\nArchivo: {file_path}\n")
+    
+    # Bucle principal de grabación
+    while True:
+        try:
+            lines = await session.read_input("[noteZ] > ")
+            if len(lines) > 1:
+                # Texto pegado: todas las líneas se guardan en una sola escritura
+                try:
+                    writer.write_batch(lines)
+                except Exception as e:
+                    print(f"Error al guardar: {e}")
+                continue
+            user_input = lines[0]
+            
+            # write_line retorna 'quit', 'read', 'hide', 'dual', 'normal', 'continue'
+            result = write_line(user_input, file_path)
+            
+            if result == 'quit':
+                print("\n¡Notas guardadas! Hasta luego.")
+                return 'quit'
+            elif result == 'read':
+                # Activar modo lectura temporal desde grabación
+                read_notes(file_path, return_to_recording=True)
+                # Continúa con el bucle de grabación tras salir de lectura
+                continue
+            elif result == 'hide':
+                return 'hide'
+            elif result == 'dual':
+                return 'dual'
+            elif result == 'normal':
+                # Ya estamos en normal, pero refrescamos la pantalla por si acaso
+                continue
+            # Si result == 'continue', simplemente continúa el bucle
+                
+        except KeyboardInterrupt:
+            # Ctrl+C: guardar línea de cierre y salir limpiamente
+            print("\n\nGuardando y cerrando...")
+            try:
+                writer.write_interrupt()
+                print("¡Notas guardadas! Hasta luego.")
+            except Exception as e:
+                print(f"Error al guardar: {e}")
+            return 'quit'
+        except EOFError:
+            # EOF (Ctrl+D en Unix): salir limpiamente
+            print("\n\n¡Hasta luego!")
+            return 'quit'
+
+
+# ============================================================================
+# DAEMON LOCAL (--daemon) Y CLIENTE (--send, --send-search, --send-tail)
+# ============================================================================
+# `notez --daemon` mantiene abiertos el almacén, el writer y los índices y
+# escucha en un socket Unix junto a notas.txt. Cada petición es una línea
+# UTF-8 y cada respuesta es "OK n" seguida de n líneas, o "ERR mensaje":
+#
+#   ADD texto        → guarda una nota
+#   SEARCH términos  → últimas SEARCH_MAX_RESULTS líneas con todos los términos
+#   TAIL n           → últimas n líneas (de la más antigua a la más reciente)
+#   PING             → comprueba que el daemon responde
+#
+# Un cliente puede enviar varias peticiones seguidas sin esperar respuesta;
+# se contestan en orden. Los ADD de todos los clientes que llegan en la
+# misma vuelta del bucle se guardan en un único append (un solo fsync con
+# --durability fsync).
+# Nombre del socket (en el directorio de notas)
+DAEMON_SOCKET_NAME = 'notez.sock'
+# Tamaño máximo de una petición
+DAEMON_MAX_REQUEST = 1024 * 1024
+# Espera máxima del cliente al conectar y a cada respuesta (segundos)
+DAEMON_CLIENT_TIMEOUT = 5.0
+# Máximo de líneas que devuelve TAIL
+DAEMON_TAIL_MAX = 10000
+
+
+def daemon_socket_path(file_path):
+    """
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+    
+    Returns:
+        str: Ruta del socket del daemon
+    """
+    return os.path.join(os.path.dirname(file_path), DAEMON_SOCKET_NAME)
+
+
+class NoteDaemon:
+    """
+    Servidor del socket: agrupa los ADD en appends por tanda y resuelve las
+    consultas en un hilo aparte para no retrasar las escrituras.
+    """
+    
+    def __init__(self, file_path, writer):
+        """
+        Args:
+            file_path (str): Ruta completa al archivo de notas
+            writer (NoteWriter): Writer de la sesión (con su almacén)
+        """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        self.socket_path = daemon_socket_path(file_path)
+        self.writer = writer
+        self.store = writer.store
+        self.loop = asyncio.new_event_loop()
+        # Un único hilo para las consultas: el índice de líneas no se comparte entre lectores
+        self.queries = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notez-query')
+        self.indexer = IndexWorker(self.store)
+        self._pending = []  # (texto, futuro) de los ADD de la tanda en curso
+        self._stopping = None
+    
+    def serve(self):
+        """Atiende peticiones hasta recibir SIGINT/SIGTERM."""
+        self.writer.listeners.append(self.indexer.notify)
+        self.indexer.start()
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            self.writer.listeners.remove(self.indexer.notify)
+            self.indexer.stop()
+            self.queries.shutdown()
+            self.loop.close()
+    
+    async def _serve(self):
+        import asyncio
+        self._stopping = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(signum, self._stopping.set)
+        # Socket accesible solo para el usuario (las notas son privadas)
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(
+                self._handle, path=self.socket_path, limit=DAEMON_MAX_REQUEST)
+        finally:
+            os.umask(old_umask)
+        flusher = self.loop.create_task(self._flush_timer())
+        print(f"noteZ daemon: escuchando en {self.socket_path} (Ctrl+C para salir)", file=sys.stderr)
+        try:
+            await self._stopping.wait()
+        finally:
+            flusher.cancel()
+            server.close()
+            await server.wait_closed()
+            self._commit_batch()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            print("noteZ daemon: detenido", file=sys.stderr)
+    
+    async def _flush_timer(self):
+        """Completa el fsync pendiente de la durabilidad 'interval'."""
+        import asyncio
+        while True:
+            await asyncio.sleep(SESSION_FLUSH_INTERVAL)
+            self.store.flush_pending()
+    
+    async def _handle(self, reader, writer):
+        """Conexión de un cliente: lee peticiones y contesta en orden."""
+        import asyncio
+        replies = asyncio.Queue()
+        sender = self.loop.create_task(self._send_replies(replies, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):  # petición demasiado larga o conexión cortada
+                    break
+                if not line:
+                    break
+                await replies.put(self._dispatch(line.decode('utf-8', errors='replace').rstrip('\r\n')))
+        finally:
+            await replies.put(None)
+            await sender
+            writer.close()
+    
+    async def _send_replies(self, replies, writer):
+        while True:
+            reply = await replies.get()
+            if reply is None:
+                break
+            try:
+                lines = await reply
+                payload = f"OK {len(lines)}\n" + "".join(line + "\n" for line in lines)
+            except Exception as e:
+                payload = f"ERR {e}\n"
+            try:
+                writer.write(payload.encode('utf-8'))
+                await writer.drain()
+            except ConnectionError:
+                pass
+    
+    def _dispatch(self, request):
+        """
+        Args:
+            request (str): Línea de la petición
+        
+        Returns:
+            asyncio.Future: Líneas de la respuesta
+        """
+        command, _, argument = request.partition(' ')
+        command = command.upper()
+        if command == 'ADD':
+            future = self.loop.create_future()
+            if not self._pending:
+                # Se guarda cuando el bucle termine de leer lo que ya ha llegado
+                self.loop.call_soon(self._commit_batch)
+            self._pending.append((argument, future))
+            return future
+        if command in ('SEARCH', 'TAIL'):
+            # Una consulta ve los ADD que se enviaron antes que ella
+            after = self._pending[-1][1] if self._pending else None
+            return self.loop.create_task(self._query(command, argument, after))
+        future = self.loop.create_future()
+        if command == 'PING':
+            future.set_result([])
+        else:
+            future.set_exception(ValueError(f"petición desconocida '{command}'"))
+        return future
+    
+    async def _query(self, command, argument, after):
+        import asyncio
+        if after is not None:
+            await asyncio.wait([after])
+        return await self.loop.run_in_executor(self.queries, query_notes, self.store, command, argument)
+    
+    def _commit_batch(self):
+        """Guarda todos los ADD pendientes en un único append."""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            self.writer.write_lines([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(OSError(f"no se pudo guardar: {e}"))
+            return
+        for _, future in batch:
+            future.set_result([])
+
+
+def query_notes(store, command, argument):
+    """
+    Resuelve una consulta de solo lectura del protocolo del daemon.
+    
+    Args:
+        store (NoteStore): Almacén de notas
+        command (str): 'SEARCH' o 'TAIL'
+        argument (str): Términos de búsqueda o número de líneas
+    
+    Returns:
+        list: Líneas de la respuesta
+    """
+    if command == 'TAIL':
+        try:
+            count = min(int(argument or READ_PAGE_LINES), DAEMON_TAIL_MAX)
+        except ValueError:
+            raise ValueError(f"TAIL necesita un número de líneas, no '{argument}'")
+    if not store.exists():
+        return []
+    if command == 'SEARCH':
+        matches = store.search(argument)[-SEARCH_MAX_RESULTS:]
+        return [next(store.iter_lines(number, number), "") for number in matches]
+    lines = []
+    for line in store.iter_lines_reverse():
+        if len(lines) >= count:
+            break
+        lines.append(line)
+    lines.reverse()
+    return lines
+
+
+def run_daemon(file_path):
+    """
+    Arranca el daemon sobre el almacén de la sesión.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+    
+    Returns:
+        int: Código de salida
+    """
+    import socket
+    if not hasattr(socket, 'AF_UNIX'):
+        print("Error: --daemon necesita sockets Unix (no disponibles en esta plataforma)", file=sys.stderr)
+        return 2
+    path = daemon_socket_path(file_path)
+    if os.path.exists(path):
+        if daemon_request(file_path, ['PING']) is not None:
+            print(f"Error: ya hay un daemon de noteZ en {path}", file=sys.stderr)
+            return 1
+        # Socket de un daemon anterior que no terminó limpiamente
+        os.unlink(path)
+    try:
+        NoteDaemon(file_path, get_note_writer(file_path)).serve()
+    except OSError as e:
+        print(f"Error al iniciar el daemon: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def daemon_request(file_path, requests):
+    """
+    Envía peticiones al daemon (todas seguidas) y lee sus respuestas.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        requests (list): Líneas de petición (p. ej. 'ADD texto')
+    
+    Returns:
+        list: Por petición, la lista de líneas de respuesta, una excepción
+            ValueError con el error del daemon o None si no llegó respuesta
+            (daemon colgado o conexión cortada); None si no hay daemon escuchando
+    """
+    import socket
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(DAEMON_CLIENT_TIMEOUT)
+    try:
+        client.connect(daemon_socket_path(file_path))
+    except OSError:
+        client.close()
+        return None
+    replies = []
+    with client, client.makefile('rb') as responses:
+        try:
+            client.sendall("".join(request + "\n" for request in requests).encode('utf-8'))
+            client.shutdown(socket.SHUT_WR)
+            for _ in requests:
+                header = responses.readline().decode('utf-8', errors='replace').rstrip('\n')
+                status, _, detail = header.partition(' ')
+                if status == 'OK':
+                    replies.append([
+                        responses.readline().decode('utf-8', errors='replace').rstrip('\n')
+                        for _ in range(int(detail))
+                    ])
+                elif status == 'ERR':
+                    replies.append(ValueError(detail))
+                else:
+                    break  # conexión cerrada sin respuesta
+        except (OSError, ValueError):
+            # Timeout (socket.timeout es un OSError) o respuesta inválida
+            pass
+    return replies + [None] * (len(requests) - len(replies))
+
+
+def run_send(file_path, text):
+    """
+    Guarda notas a través del daemon; sin daemon, las escribe directamente.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        text (str): Texto de la nota ('-' lee las líneas de stdin)
+    
+    Returns:
+        int: Código de salida
+    """
+    if text == '-':
+        text = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace').read()
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return 0
+    replies = daemon_request(file_path, [f"ADD {line}" for line in lines])
+    if replies is None:
+        replies = [None] * len(lines)
+    # Lo que el daemon no confirmó se escribe directamente
+    unanswered = [line for line, reply in zip(lines, replies) if reply is None]
+    if unanswered:
+        get_note_writer(file_path).write_lines(unanswered)
+    errors = [reply for reply in replies if isinstance(reply, Exception)]
+    for error in errors[:1]:
+        print(f"Error al guardar la nota: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def run_send_query(file_path, command, argument):
+    """
+    Consulta SEARCH o TAIL a través del daemon (o directamente si no hay
+    daemon) e imprime las líneas, una por línea.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        command (str): 'SEARCH' o 'TAIL'
+        argument (str): Términos de búsqueda o número de líneas
+    
+    Returns:
+        int: Código de salida
+    """
+    replies = daemon_request(file_path, [f"{command} {argument}"])
+    if replies is None or replies[0] is None:
+        try:
+            replies = [query_notes(get_note_store(file_path), command, argument)]
+        except Exception as e:
+            replies = [e]
+    reply = replies[0]
+    if isinstance(reply, Exception):
+        print(f"Error en la consulta: {reply}", file=sys.stderr)
+        return 1
+    for line in reply:
+        print(line)
+    return 0
+
+
+# ============================================================================
+# COMANDOS DE UNA SOLA OPERACIÓN (notez add / tail / count / last-session)
+# ============================================================================
+# Para scripts y barras de estado: cada comando hace una operación acotada y
+# sale, sin interfaz ni lectura completa del archivo. add y tail pasan por
+# el daemon si está en marcha.
+ONESHOT_COMMANDS = ('add', 'tail', 'count', 'last-session')
+ONESHOT_USAGE = (
+    "uso: notez add TEXTO | notez tail [-n N] | notez count | notez last-session"
+)
+# Límite de líneas que muestra last-session (las más recientes)
+LAST_SESSION_MAX_LINES = 10000
+
+
+def parse_command(argv):
+    """
+    Interpreta un comando de una sola operación (sin construir el parser).
+    
+    Args:
+        argv (list): Argumentos, empezando por el nombre del comando
+    
+    Returns:
+        Namespace: CLI_DEFAULTS más command y command_arg
+    """
+    command, rest = argv[0], argv[1:]
+    argument = None
+    if command == 'add':
+        if rest[:1] == ['--']:
+            rest = rest[1:]
+        argument = ' '.join(rest)
+        valid = bool(argument.strip())
+    elif command == 'tail':
+        if len(rest) == 2 and rest[0] in ('-n', '--lines'):
+            rest = rest[1:]
+        elif len(rest) == 1 and rest[0].startswith('-n') and len(rest[0]) > 2:
+            rest = [rest[0][2:]]
+        argument = rest[0] if rest else str(READ_PAGE_LINES)
+        valid = len(rest) <= 1 and argument.isdigit()
+    else:
+        valid = not rest
+    if not valid:
+        print(ONESHOT_USAGE, file=sys.stderr)
+        print(f"notez {command}: argumentos no válidos: {' '.join(rest) or '(faltan)'}", file=sys.stderr)
+        sys.exit(2)
+    return types.SimpleNamespace(**dict(CLI_DEFAULTS, command=command, command_arg=argument))
+
+
+def last_session_lines(store, limit=LAST_SESSION_MAX_LINES):
+    """
+    Líneas de la sesión más reciente, leyendo desde el final.
+    
+    Se saltan las marcas de cierre de esa sesión y se recorre hacia atrás
+    hasta la marca de cierre (o interrupción) de la sesión anterior.
+    
+    Args:
+        store (NoteStore): Almacén de notas
+        limit (int): Máximo de líneas a devolver
+    
+    Returns:
+        tuple: (líneas de la más antigua a la más reciente, True si se recortó)
+    """
+    lines = []
+    closing = True
+    for line in store.iter_lines_reverse():
+        record = next(iter_note_records([line]))
+        if record['kind'] in ('session_end', 'interrupt'):
+            if closing:
+                continue
+            break
+        closing = False
+        if len(lines) >= limit:
+            lines.reverse()
+            return lines, True
+        lines.append(line)
+    lines.reverse()
+    return lines, False
+
+
+def run_command(file_path, command, argument):
+    """
+    Ejecuta un comando de una sola operación.
+    
+    Args:
+        file_path (str): Ruta completa al archivo de notas
+        command (str): Uno de ONESHOT_COMMANDS
+        argument (str): Texto de add o número de líneas de tail
+    
+    Returns:
+        int: Código de salida
+    """
+    if command == 'add':
+        return run_send(file_path, argument)
+    if command == 'tail':
+        return run_send_query(file_path, 'TAIL', argument)
+    store = get_note_store(file_path)
+    try:
+        if command == 'count':
+            print(store.line_count() if store.exists() else 0)
+            return 0
+        lines, truncated = last_session_lines(store) if store.exists() else ([], False)
+    except (OSError, ValueError) as e:
+        print(f"Error al leer las notas: {e}", file=sys.stderr)
+        return 1
+    if truncated:
+        print(f"noteZ: se muestran las últimas {len(lines)} líneas de la sesión", file=sys.stderr)
+    for line in lines:
+        print(line)
+    return 0
+
+
+# ============================================================================
+# INSTRUMENTACIÓN (--stats, /stats y --profile)
+# ============================================================================
+# Con --stats se envuelven las funciones del camino crítico (escritura,
+# lectura, índices, render y salida al terminal) para registrar histogramas
+# de latencia y bytes por operación. Sin --stats no se envuelve nada y el
+# coste es cero.
+# Cubos del histograma: potencias de 2 en microsegundos (1 µs .. ~35 min)
+STATS_HISTOGRAM_BUCKETS = 32
+
+# Estadísticas de la sesión (None mientras --stats no esté activo)
+_session_stats = None
+
+
+class LatencyStats:
+    """
+    Histogramas de latencia y bytes acumulados por operación.
+    
+    Cada operación cuenta llamadas, tiempo total y máximo, bytes y un
+    histograma en cubos de potencias de 2 (µs), del que se obtienen los
+    percentiles sin guardar cada medición. Es seguro entre hilos (el
+    IndexWorker también registra).
+    """
+    
+    def __init__(self):
+        self.operations = {}  # nombre → {'count', 'total', 'max', 'bytes', 'buckets'}
+        self._lock = threading.Lock()
+    
+    def record(self, name, seconds, nbytes=0):
+        """
+        Registra una llamada.
+        
+        Args:
+            name (str): Operación
+            seconds (float): Duración de la llamada
+            nbytes (int): Bytes escritos, leídos o enviados al terminal
+        """
+        bucket = min(int(seconds * 1e6).bit_length(), STATS_HISTOGRAM_BUCKETS - 1)
+        with self._lock:
+            op = self.operations.get(name)
+            if op is None:
+                op = {'count': 0, 'total': 0.0, 'max': 0.0, 'bytes': 0,
+                      'buckets': [0] * STATS_HISTOGRAM_BUCKETS}
+                self.operations[name] = op
+            op['count'] += 1
+            op['total'] += seconds
+            op['max'] = max(op['max'], seconds)
+            op['bytes'] += nbytes
+            op['buckets'][bucket] += 1
+    
+    @staticmethod
+    def _percentile_us(op, fraction):
+        """Límite superior (µs) del cubo donde cae el percentil pedido (acotado al máximo)."""
+        target = op['count'] * fraction
+        seen = 0
+        for bucket, count in enumerate(op['buckets']):
+            seen += count
+            if count and seen >= target:
+                return min(1 << bucket, round(op['max'] * 1e6, 1))
+        return 0
+    
+    def summary(self):
+        """
+        Returns:
+            list: Un dict por operación (ordenadas por tiempo total) con
+                count, total_ms, mean_us, p50_us, p99_us, max_us, bytes e histogram
+        """
+        with self._lock:
+            operations = {name: dict(op, buckets=list(op['buckets'])) for name, op in self.operations.items()}
+        rows = []
+        for name, op in sorted(operations.items(), key=lambda item: -item[1]['total']):
+            rows.append({
+                'operation': name,
+                'count': op['count'],
+                'total_ms': round(op['total'] * 1000, 3),
+                'mean_us': round(op['total'] / op['count'] * 1e6, 1),
+                'p50_us': self._percentile_us(op, 0.50),
+                'p99_us': self._percentile_us(op, 0.99),
+                'max_us': round(op['max'] * 1e6, 1),
+                'bytes': op['bytes'],
+                # Límite superior del cubo en µs → llamadas
+                'histogram': {1 << b: c for b, c in enumerate(op['buckets']) if c},
+            })
+        return rows
+    
+    def dump(self, path):
+        """Guarda el resumen en JSON."""
+        import json
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                       'operations': self.summary()}, f, ensure_ascii=False, indent=2)
+
+
+def _format_us(us):
+    """Duración legible a partir de microsegundos."""
+    if us >= 1000000:
+        return f"{us / 1000000:.2f}s"
+    if us >= 1000:
+        return f"{us / 1000:.1f}ms"
+    return f"{us:.0f}µs"
+
+
+def _instrumented(func, name, count_bytes=None):
     """
-    Ejecuta el modo hide (privacidad ampliada).
-    Limpia la pantalla tras cada nota guardada para proteger la información.
+    Envuelve una función para registrar su latencia en las estadísticas.
     
     Args:
-        file_path (str): Ruta completa al archivo de notas
-        
-    Returns:
-        str: Próximo estado ('quit', 'normal', 'dual')
+        func (callable): Función o método original
+        name (str): Nombre de la operación
+        count_bytes (callable): (args, resultado) → bytes de la llamada
     """
-    # Limpiar pantalla al iniciar modo hide
-    clear_screen()
-    display_hide_header()
-    print(f"\nArchivo: {file_path}\n")
-    
-    # Bucle principal del modo hide
-    while True:
-        try:
-            user_input = input("[noteZ HIDE] > ")
-            
-            # Manejar comandos especiales
-            if user_input == '/q':
-                # Escribir línea decorativa final y salir
-                timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
-                try:
-                    with open(file_path, 'a', encoding='utf-8') as f:
-                        f.write(f"{timestamp} ============================ Sesión finalizada ===========================\n")
-                except Exception as e:
-                    print(f"Error al guardar: {e}")
-                    clear_screen()
-                print("\n¡Notas guardadas! Hasta luego.")
-                return 'quit'
-                
-            elif user_input == '/h':
-                # Mostrar ayuda
-                clear_screen()
-                show_help()
-                # Limpiar pantalla tras ver ayuda y mostrar header compacto
-                clear_screen()
-                display_hide_header(compact=True)
-                print()
-                continue
-                
-            elif user_input == '/n':
-                # Línea vacía como separador mínimo
-                try:
-                    with open(file_path, 'a', encoding='utf-8') as f:
-                        f.write("\n")
-                except Exception as e:
-                    print(f"Error al guardar: {e}")
-                # Limpiar pantalla tras guardar
-                clear_screen()
-                display_hide_header(compact=True)
-                print("\n✓ Separador guardado\n")
-                continue
-                
-            elif user_input == '/n=':
-                # Línea decorativa con separador
-                timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
-                try:
-                    with open(file_path, 'a', encoding='utf-8') as f:
-                        f.write(f"{timestamp} ==========================================================================\n")
-                except Exception as e:
-                    print(f"Error al guardar: {e}")
-                # Limpiar pantalla tras guardar
-                clear_screen()
-                display_hide_header(compact=True)
-                print("\n✓ Separador decorativo guardado\n")
-                continue
-                
-            elif user_input == '/r':
-                # Modo lectura temporal
-                read_notes(file_path, return_to_recording=True)
-                # Limpiar pantalla tras volver de lectura
-                clear_screen()
-                display_hide_header(compact=True)
-                print()
-                continue
-                
-            elif user_input == '/hide':
-                # Ya estamos en modo hide
-                print("(Ya estás en modo privacidad)")
-                clear_screen()
-                display_hide_header(compact=True)
-                print()
-                continue
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        nbytes = count_bytes(args, result) if count_bytes else 0
+        _session_stats.record(name, time.perf_counter() - start, nbytes)
+        return result
+    return wrapper
 
-            elif user_input == '/normal':
-                clear_screen()
-                return 'normal'
 
-            elif user_input == '/dual':
-                return 'dual'
-                
-            else:
-                # Línea normal de nota con timestamp
-                if user_input.strip():  # Solo escribir si no está vacía
-                    timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
-                    try:
-                        with open(file_path, 'a', encoding='utf-8') as f:
-                            f.write(f"{timestamp} {user_input}\n")
-                    except Exception as e:
-                        clear_screen()
-                        display_hide_header(compact=True)
-                        print(f"\nError al guardar: {e}\n")
-                    
-                    # Limpiar pantalla tras guardar - PRIVACIDAD
-                    clear_screen()
-                    display_hide_header(compact=True)
-                    print("\n✓ Nota guardada\n")
-                
-        except KeyboardInterrupt:
-            # Ctrl+C: guardar línea de cierre y salir limpiamente
-            print("\n\nGuardando y cerrando...")
-            timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
-            try:
-                with open(file_path, 'a', encoding='utf-8') as f:
-                    f.write(f"{timestamp} ========== Interrupción del usuario ==========\n")
-                clear_screen()
-                print("¡Notas guardadas! Hasta luego.")
-            except Exception as e:
-                print(f"Error al guardar: {e}")
-                clear_screen()
-            return 'quit'
-        except EOFError:
-            # EOF (Ctrl+D en Unix): salir limpiamente
-            clear_screen()
-            print("\n\n¡Hasta luego!")
-            return 'quit'
+def enable_stats():
+    """
+    Activa la instrumentación del camino crítico (solo la primera vez).
+    
+    Returns:
+        LatencyStats: Estadísticas de la sesión
+    """
+    global _session_stats
+    if _session_stats is not None:
+        return _session_stats
+    _session_stats = LatencyStats()
+    module = sys.modules[__name__]
+    targets = (
+        (NoteWriter, 'append', 'write.append', lambda args, result: len(args[1].encode('utf-8'))),
+        (NoteStream, 'read', 'read.block', lambda args, result: len(result)),
+        (NoteStream, 'readline', 'read.line', lambda args, result: len(result)),
+        (TailBuffer, 'reload', 'read.tail_reload', None),
+        (TailBuffer, 'catch_up', 'read.tail_catch_up', None),
+        (LineIndex, 'update', 'index.lines', None),
+        (SearchIndex, 'update', 'index.search', None),
+        (module, 'build_dual_frame', 'render.dual_frame', None),
+        (module, 'render_dual_read_panel', 'render.dual_panel', None),
+        (ScreenRenderer, 'render', 'render.screen', None),
+        (ScreenRenderer, 'render_rows', 'render.rows', None),
+        (module, 'write_terminal', 'terminal.write', lambda args, result: len(args[0].encode('utf-8'))),
+    )
+    for owner, attribute, name, count_bytes in targets:
+        setattr(owner, attribute, _instrumented(getattr(owner, attribute), name, count_bytes))
+    return _session_stats
 
 
-def run_recording_mode(file_path):
+def show_stats(wait=False):
     """
-    Ejecuta el modo normal de grabación.
+    Muestra las latencias registradas en la sesión (comando /stats).
     
     Args:
-        file_path (str): Ruta completa al archivo de notas
-        
+        wait (bool): Esperar Enter antes de volver (modos que repintan la pantalla)
+    """
+    if _session_stats is None:
+        print("Estadísticas desactivadas: inicia noteZ con --stats para registrarlas.")
+    else:
+        rows = _session_stats.summary()
+        print(f"\n── noteZ STATS ── {len(rows)} operaciones ──")
+        print(f"{'operación':<20} {'llamadas':>8} {'total':>9} {'media':>8} "
+              f"{'p50':>8} {'p99':>8} {'máx':>8} {'bytes':>10}")
+        for row in rows:
+            print(f"{row['operation']:<20} {row['count']:>8} {_format_us(row['total_ms'] * 1000):>9} "
+                  f"{_format_us(row['mean_us']):>8} {_format_us(row['p50_us']):>8} "
+                  f"{_format_us(row['p99_us']):>8} {_format_us(row['max_us']):>8} {row['bytes']:>10}")
+        if not rows:
+            print("(Sin operaciones registradas todavía)")
+    if wait:
+        input("\nPresiona Enter para continuar...")
+
+
+def start_profiler():
+    """
+    Arranca cProfile para toda la sesión (--profile).
+    
     Returns:
-        str: Próximo estado ('quit', 'hide', 'dual')
+        cProfile.Profile: Perfilador activo
     """
-    clear_screen()
-    print("╭─────────────────────────────────────────╮")
-    print("│     noteZ - Notas Rápidas Continuas     │")
-    print("│                                         │")
-    print("│  Escribe tus notas y presiona Enter     │")
-    print("│  Comandos: /n /n= /r /h /hide /dual /q  │")
-    print("│  Ctrl+C para salir seguro              │")
-    print("╰─────────────────────────────────────────╯")
-    print(f"\nArchivo: {file_path}\n")
+    # Solo se importa si se pide el perfil
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profiler(profiler, path):
+    """
+    Detiene el perfilador y guarda el perfil (se abre con `python -m pstats ARCHIVO`).
     
-    # Bucle principal de grabación
-    while True:
-        try:
-            user_input = input("[noteZ] > ")
-            
-            # write_line retorna 'quit', 'read', 'hide', 'dual', 'normal', 'continue'
-            result = write_line(user_input, file_path)
-            
-            if result == 'quit':
-                print("\n¡Notas guardadas! Hasta luego.")
-                return 'quit'
-            elif result == 'read':
-                # Activar modo lectura temporal desde grabación
-                read_notes(file_path, return_to_recording=True)
-                # Continúa con el bucle de grabación tras salir de lectura
-                continue
-            elif result == 'hide':
-                return 'hide'
-            elif result == 'dual':
-                return 'dual'
-            elif result == 'normal':
-                # Ya estamos en normal, pero refrescamos la pantalla por si acaso
-                continue
-            # Si result == 'continue', simplemente continúa el bucle
-                
-        except KeyboardInterrupt:
-            # Ctrl+C: guardar línea de cierre y salir limpiamente
-            print("\n\nGuardando y cerrando...")
-            timestamp = datetime.now().strftime("[%d-%m-%Y | %H:%M]")
-            try:
-                with open(file_path, 'a', encoding='utf-8') as f:
-                    f.write(f"{timestamp} ========== Interrupción del usuario ==========\n")
-                print("¡Notas guardadas! Hasta luego.")
-            except Exception as e:
-                print(f"Error al guardar: {e}")
-            return 'quit'
-        except EOFError:
-            # EOF (Ctrl+D en Unix): salir limpiamente
-            print("\n\n¡Hasta luego!")
-            return 'quit'
+    Args:
+        profiler (cProfile.Profile): Perfilador activo
+        path (str): Archivo de salida
+    """
+    profiler.disable()
+    try:
+        profiler.dump_stats(path)
+        print(f"noteZ: perfil guardado en {path} (python -m pstats {path})", file=sys.stderr)
+    except OSError as e:
+        print(f"Error al guardar el perfil: {e}", file=sys.stderr)
 
 
-def main():
+# ============================================================================
+# ARGUMENTOS DE LÍNEA DE COMANDOS
+# ============================================================================
+# Valores de `notez` sin argumentos. Es el arranque más frecuente (alias de
+# shell), así que no construye el parser: solo importar argparse y montar la
+# ayuda ya se nota en Termux. build_arg_parser() usa los mismos defaults.
+CLI_DEFAULTS = {
+    'read': False,
+    'dual': False,
+    'hide': False,
+    'search': None,
+    'grep': None,
+    'since': None,
+    'until': None,
+    'export': None,
+    'ingest': False,
+    'durability': WRITE_DURABILITY,
+    'backend': None,
+    'import_text': False,
+    'stats': None,
+    'profile': None,
+    'daemon': False,
+    'send': None,
+    'send_search': None,
+    'send_tail': None,
+    'command': None,
+    'command_arg': None,
+}
+
+
+def parse_args(argv=None):
     """
-    Función principal que maneja argumentos y ejecuta el bucle apropiado.
+    Interpreta los argumentos; sin argumentos o con un comando de una sola
+    operación (add, tail...) no importa argparse.
+    
+    Args:
+        argv (list): Argumentos (default: sys.argv[1:])
+    
+    Returns:
+        Namespace con un atributo por clave de CLI_DEFAULTS
     """
-    # Forzar encoding UTF-8 para Windows
-    if sys.platform == 'win32':
-        try:
-            sys.stdout.reconfigure(encoding='utf-8')
-        except AttributeError:
-            pass
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        return types.SimpleNamespace(**CLI_DEFAULTS)
+    if argv[0] in ONESHOT_COMMANDS:
+        return parse_command(argv)
+    return build_arg_parser().parse_args(argv)
+
 
-    # Configurar parser de argumentos
+def build_arg_parser():
+    """
+    Construye el parser completo (con la ayuda extendida).
+    
+    Returns:
+        argparse.ArgumentParser: Parser de noteZ
+    """
+    import argparse
     parser = argparse.ArgumentParser(
         description="noteZ - CLI minimalista para notas incrementales",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -725,12 +5212,30 @@ Ejemplos de uso:
   notez -r        Modo lectura
   notez -dual     Modo dual (split-screen)
   notez -hide     Modo privacidad (limpia pantalla tras cada nota)
+  notez -s idea login   Buscar notas con todos los términos
+  notez --grep 'error \d+'   Buscar con expresión regular (en paralelo)
+  notez --since 01-10-2026 --until 07-10-2026   Notas de un rango de fechas
+  notez --export jsonl > notas.jsonl   Exportar (jsonl, csv o md; admite --since/--until)
+  notez --durability fsync   Forzar cada nota a disco (máxima seguridad)
+  notez --import-text        Copiar notas.txt a SQLite (desde entonces se usa notas.db)
+  notez --daemon             Daemon local: almacén e índices abiertos en un socket Unix
+  notez --send idea rápida   Guardar una nota a través del daemon (sin él, directamente)
+  notez --send-tail 20       Últimas 20 líneas (--send-search TÉRMINOS para buscar)
+  
+Comandos de una sola operación (para scripts y barras de estado):
+  notez add "texto"   Guardar una nota y salir ('-' lee stdin)
+  notez tail -n 20    Últimas 20 líneas
+  notez count         Número de líneas guardadas
+  notez last-session  Notas de la última sesión
+  comando | notez            Guardar la salida de un comando (modo ingesta)
   
 Comandos durante grabación:
   /n      Línea vacía
   /n=     Separador decorativo
   /r      Leer notas (modo lectura temporal)
+  /s txt  Buscar en las notas
   /h      Ayuda
+  /stats  Latencias de la sesión (con --stats)
   /hide   Activar modo privacidad
   /dual   Activar modo dual
   /normal Volver a modo normal
@@ -769,18 +5274,162 @@ Modo Hide (Privacidad):
         help='Inicia modo privacidad: limpia pantalla tras cada nota guardada'
     )
     
+    parser.add_argument(
+        '-s',
+        dest='search',
+        nargs='+',
+        metavar='TÉRMINO',
+        help='Busca notas que contengan todos los términos (índice invertido)'
+    )
+    
+    parser.add_argument(
+        '--grep',
+        metavar='PATRÓN',
+        help='Busca las líneas que coinciden con una expresión regular (en paralelo, sin índice)'
+    )
+    
+    parser.add_argument(
+        '--since',
+        metavar='FECHA',
+        help='Muestra las notas desde FECHA (dd-mm-aaaa [HH:MM])'
+    )
+    
+    parser.add_argument(
+        '--until',
+        metavar='FECHA',
+        help='Muestra las notas hasta FECHA incluida (dd-mm-aaaa [HH:MM])'
+    )
+    
+    parser.add_argument(
+        '--export',
+        choices=EXPORT_FORMATS,
+        metavar='FORMATO',
+        help='Exporta las notas a stdout en jsonl, csv o md (admite --since/--until)'
+    )
+    
+    parser.add_argument(
+        '--ingest',
+        dest='ingest',
+        action='store_true',
+        help='Guarda cada línea de stdin como nota y sale (automático si stdin no es un terminal)'
+    )
+    
+    parser.add_argument(
+        '--durability',
+        choices=DURABILITY_MODES,
+        default=WRITE_DURABILITY,
+        help='Durabilidad de cada nota: flush (default), fsync por nota, '
+             'o interval (fsync cada %d notas / %d ms)' % (WRITE_FSYNC_INTERVAL_NOTES, WRITE_FSYNC_INTERVAL_MS)
+    )
+    
+    parser.add_argument(
+        '--backend',
+        choices=sorted(NOTE_BACKENDS),
+        help='Almacenamiento: text (notas.txt) o sqlite (notas.db con FTS5). Se recuerda '
+             'para las siguientes invocaciones; sin elegirlo, se usa notas.db si existe'
+    )
+    
+    parser.add_argument(
+        '--import-text',
+        dest='import_text',
+        action='store_true',
+        help='Importa notas.txt (y sus segmentos) en notas.db y pasa a usar el backend sqlite'
+    )
+    
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Mantiene el almacén, el writer y los índices abiertos y atiende '
+             'peticiones en un socket Unix (%s junto a notas.txt)' % DAEMON_SOCKET_NAME
+    )
+    
+    parser.add_argument(
+        '--send',
+        nargs='+',
+        metavar='TEXTO',
+        help="Guarda una nota a través del daemon ('-' lee stdin); sin daemon la escribe directamente"
+    )
+    
+    parser.add_argument(
+        '--send-search',
+        dest='send_search',
+        nargs='+',
+        metavar='TÉRMINO',
+        help='Busca a través del daemon e imprime las líneas encontradas'
+    )
+    
+    parser.add_argument(
+        '--send-tail',
+        dest='send_tail',
+        type=int,
+        metavar='N',
+        help='Imprime las últimas N líneas a través del daemon'
+    )
+    
+    parser.add_argument(
+        '--stats',
+        nargs='?',
+        const='',
+        metavar='ARCHIVO',
+        help='Registra latencias y bytes de escritura, lectura y render (/stats); '
+             'con ARCHIVO las guarda en JSON al salir'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        metavar='ARCHIVO',
+        help='Perfila toda la sesión con cProfile y guarda el resultado en ARCHIVO'
+    )
+    
     parser.add_argument(
         '--version',
         action='version',
         version='noteZ 2.0.0-FINAL'
     )
+    parser.set_defaults(**CLI_DEFAULTS)
+    return parser
+
+
+def main():
+    """
+    Función principal que maneja argumentos y ejecuta el bucle apropiado.
+    """
+    # Forzar encoding UTF-8 para Windows
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except AttributeError:
+            pass
     
-    args = parser.parse_args()
+    args = parse_args()
     
     # Obtener ruta del archivo según la plataforma
     notes_file = get_path()
+    if args.import_text:
+        sys.exit(run_import_text(notes_file))
+    # Instrumentación opcional: se activa antes de abrir el almacén
+    profiler = start_profiler() if args.profile else None
+    if args.stats is not None:
+        enable_stats()
+    if args.backend:
+        save_backend_setting(notes_file, args.backend)
+    # Almacén y writer únicos de la sesión, compartidos por todos los modos
+    get_note_store(notes_file, backend=args.backend, durability=args.durability)
+    get_note_writer(notes_file)
     
     try:
+        if args.command:
+            sys.exit(run_command(notes_file, args.command, args.command_arg))
+        elif args.daemon:
+            sys.exit(run_daemon(notes_file))
+        elif args.send:
+            # Cliente del daemon (escribe directamente si no hay daemon)
+            sys.exit(run_send(notes_file, ' '.join(args.send)))
+        elif args.send_search:
+            sys.exit(run_send_query(notes_file, 'SEARCH', ' '.join(args.send_search)))
+        elif args.send_tail is not None:
+            sys.exit(run_send_query(notes_file, 'TAIL', str(args.send_tail)))
+        
         # Determinar estado inicial
         current_state = 'normal'
         if args.hide:
@@ -791,23 +5440,62 @@ Modo Hide (Privacidad):
             # Modo lectura es especial, se ejecuta y sale
             read_notes(notes_file)
             return
+        elif args.since or args.until or args.export:
+            # Consulta o exportación de un rango de fechas: muestra y sale
+            try:
+                since = parse_date_arg(args.since) if args.since else None
+                until = parse_date_arg(args.until, end_of_day=True) if args.until else None
+            except ValueError as e:
+                print(e)
+                sys.exit(2)
+            if args.export:
+                try:
+                    run_export(notes_file, args.export, since, until)
+                except BrokenPipeError:
+                    # La salida se cortó (p. ej. `| head`): no es un error
+                    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                return
+            print_date_range(notes_file, since, until)
+            return
+        elif args.search:
+            # Búsqueda: muestra resultados (y opcionalmente lectura) y sale
+            run_search(notes_file, ' '.join(args.search))
+            return
+        elif args.grep is not None:
+            # Expresión regular sobre todas las notas: muestra resultados y sale
+            run_grep(notes_file, args.grep)
+            return
+        elif args.ingest or not sys.stdin.isatty():
+            # Entrada desde pipe/script: ingesta directa sin interfaz
+            run_ingest_mode(notes_file)
+            return
 
-        # Máquina de estados principal
-        while current_state != 'quit':
-            if current_state == 'normal':
-                current_state = run_recording_mode(notes_file)
-            elif current_state == 'hide':
-                current_state = run_hide_mode(notes_file)
-            elif current_state == 'dual':
-                current_state = run_dual_mode(notes_file)
-            else:
-                # Estado desconocido, salir por seguridad
-                print(f"Error: Estado desconocido '{current_state}'")
-                break
+        # Máquina de estados principal, sobre el bucle de eventos de la sesión
+        session = InteractiveSession(get_note_writer(notes_file))
+        modes = {'normal': run_recording_mode, 'hide': run_hide_mode, 'dual': run_dual_mode}
+        try:
+            while current_state != 'quit':
+                if current_state not in modes:
+                    # Estado desconocido, salir por seguridad
+                    print(f"Error: Estado desconocido '{current_state}'")
+                    break
+                current_state = session.run(modes[current_state](notes_file, session))
+        finally:
+            session.close()
                     
     except Exception as e:
         print(f"Error crítico: {e}")
         sys.exit(1)
+    finally:
+        close_note_writers()
+        if args.stats:
+            try:
+                _session_stats.dump(args.stats)
+                print(f"noteZ: estadísticas guardadas en {args.stats}", file=sys.stderr)
+            except OSError as e:
+                print(f"Error al guardar las estadísticas: {e}", file=sys.stderr)
+        if profiler is not None:
+            stop_profiler(profiler, args.profile)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+stress_notez - Prueba de concurrencia de las escrituras de noteZ
+
+Lanza varios procesos que escriben a la vez en el mismo notas.txt (con
+notas de hasta varios KB y rotación de segmentos) y comprueba que cada
+línea llega completa, sin cortarse ni mezclarse con otra, que no falta
+ninguna y que el índice de líneas queda al día.
+
+Uso:
+  python stress_notez.py                          # 8 procesos × 2000 notas
+  python stress_notez.py --processes 16 --notes 5000
+  python stress_notez.py --dir /tmp/notez-stress  # directorio de trabajo
+
+Sale con código 1 si alguna comprobación falla. bench_notez.py la usa
+también como medición de throughput (stress).
+"""
+
+import sys
+import os
+import argparse
+import shutil
+import subprocess
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import notez
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+# Procesos escritores y notas por proceso
+STRESS_PROCESSES = 8
+STRESS_NOTES = 2000
+# Longitud máxima del relleno de cada nota (notas de hasta varios KB)
+STRESS_MAX_PADDING = 4000
+
+
+# ============================================================================
+# PRUEBA
+# ============================================================================
+def stress_writer(path, worker, notes):
+    """Proceso escritor: guarda notas largas con una firma verificable."""
+    store = notez.TextNoteStore(path)
+    writer = notez.NoteWriter(store)
+    for seq in range(notes):
+        # Notas de longitud variable con su propia firma
+        body = f"w{worker}-{seq}-" + 'x' * (seq * 37 % STRESS_MAX_PADDING)
+        writer.write_lines([f"{body} fin{len(body)}"])
+    writer.close()
+
+
+def run_stress(directory, processes=STRESS_PROCESSES, notes=STRESS_NOTES):
+    """
+    Varios procesos escriben a la vez en el mismo archivo y se verifica el resultado.
+
+    Args:
+        directory (str): Directorio de trabajo (se borra al terminar)
+        processes (int): Procesos escritores
+        notes (int): Notas por proceso
+
+    Returns:
+        dict: ok, elapsed (segundos), corrupted, missing y failed (procesos con error)
+    """
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    path = os.path.join(directory, 'notas.txt')
+    try:
+        start = time.perf_counter()
+        children = [
+            subprocess.Popen([
+                sys.executable, os.path.abspath(__file__), '--writer', path,
+                '--worker', str(worker), '--notes', str(notes),
+            ])
+            for worker in range(processes)
+        ]
+        failed = sum(1 for child in children if child.wait() != 0)
+        elapsed = time.perf_counter() - start
+
+        corrupted = 0
+        seen = set()
+        with notez.open_notes(path) as f:
+            for raw in iter(f.readline, b''):
+                text = raw.decode('utf-8').rstrip('\r\n')
+                body, _, tail = text.partition('] ')[2].rpartition(' fin')
+                if not body.startswith('w') or tail != str(len(body)) or body in seen:
+                    corrupted += 1
+                seen.add(body)
+        index = notez.LineIndex(path)
+        index_ok = index.is_fresh() and index.line_count() == len(seen) + corrupted
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    missing = processes * notes - len(seen)
+    return {
+        'ok': failed == 0 and corrupted == 0 and missing == 0 and index_ok,
+        'elapsed': elapsed,
+        'corrupted': corrupted,
+        'missing': missing,
+        'failed': failed,
+    }
+
+
+def main():
+    """Punto de entrada de la prueba de concurrencia."""
+    parser = argparse.ArgumentParser(description="Prueba de concurrencia de las escrituras de noteZ")
+    parser.add_argument('--processes', type=int, default=STRESS_PROCESSES,
+                        help=f'Procesos escritores (default: {STRESS_PROCESSES})')
+    parser.add_argument('--notes', type=int, default=STRESS_NOTES,
+                        help=f'Notas por proceso (default: {STRESS_NOTES})')
+    parser.add_argument('--dir', default=os.path.join(tempfile.gettempdir(), f"notez-stress-{os.getpid()}"),
+                        help='Directorio de trabajo (se borra al terminar)')
+    # Opciones internas de los procesos escritores
+    parser.add_argument('--writer', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.writer:
+        stress_writer(args.writer, args.worker, args.notes)
+        return
+
+    result = run_stress(args.dir, args.processes, args.notes)
+    total = args.processes * args.notes
+    print(f"{args.processes} procesos × {args.notes} notas: {total / result['elapsed']:.0f} notas/s")
+    print(f"líneas corruptas: {result['corrupted']}  faltantes: {result['missing']}  "
+          f"procesos con error: {result['failed']}")
+    print("OK" if result['ok'] else "FALLO")
+    if not result['ok']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()